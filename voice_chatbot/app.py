@@ -1,8 +1,21 @@
 import streamlit as st
+from pathlib import Path
 from modules.chatbot import Chatbot
+from modules.gemini import RATE_LIMIT_MESSAGE, REJECTION_MESSAGE
 
 st.title("AI Voice Chatbot") # Title
 
+# Number of past conversations added to the sidebar per "Load more" click
+HISTORY_PAGE_SIZE = 10
+
+
+def show_audio(container, audio_file):
+    """Play a saved clip; cached speech may have been evicted since it was saved"""
+    if audio_file and Path(audio_file).exists():
+        container.audio(audio_file)
+    elif audio_file:
+        container.caption("Audio no longer available")
+
 
 # Check if the session state has a key 'chatbot'
 # If it doesn't, it will be created and initialized with a Chatbot object
@@ -24,6 +37,7 @@ with st.sidebar:
             if st.session_state.chatbot.history_manager.delete_all_history():
                 st.success("All history deleted successfully!")
                 st.session_state.conversation = []  # Clear current conversation
+                st.session_state.pop('history_headers', None)
             else:
                 st.error("Failed to delete history")
             st.session_state.confirm_delete_all = False
@@ -48,34 +62,137 @@ with st.sidebar:
             st.text(f"Response Generation: {stats.format_time(stats.last_response_time)}")
             if stats.last_audio_time is not None:
                 st.text(f"Audio Generation: {stats.format_time(stats.last_audio_time)}")
+            if stats.last_first_audio_time is not None:
+                st.text(f"First Audio: {stats.format_time(stats.last_first_audio_time)}")
             if stats.last_total_time is not None:
                 st.text(f"Total Time: {stats.format_time(stats.last_total_time)}")
 
+        # Tail latency per pipeline stage since startup
+        recorded = [stage for stage in stats.STAGES if stats.histograms[stage].count]
+        if recorded:
+            st.markdown("**Latency (p50 / p90 / p99 / max):**")
+            for stage in recorded:
+                summary = stats.percentiles(stage)
+                st.text(f"{stage.replace('_', ' ').capitalize()}: "
+                        + " / ".join(stats.format_time(summary[key]) for key in ("p50", "p90", "p99", "max"))
+                        + f" (n={summary['count']})")
+
+        response_cache = st.session_state.chatbot.gemini.cache.stats()
+        st.text(f"Response Cache: {response_cache['hits']} hits / {response_cache['misses']} misses")
+
+        semantic_cache = st.session_state.chatbot.gemini.semantic_cache
+        if semantic_cache is not None:
+            semantic_stats = semantic_cache.stats()
+            st.text(f"Semantic Cache: {semantic_stats['hit_rate']:.0%} hit rate "
+                    f"(threshold {semantic_stats['threshold']:.2f})")
+            if semantic_stats['last_similarity'] is not None:
+                st.text(f"Last Similarity: {semantic_stats['last_similarity']:.3f}")
+
+        topic_counts = st.session_state.chatbot.gemini.topic_classifier.counts
+        local_checks = topic_counts['keyword'] + topic_counts['model'] + topic_counts['memo']
+        st.text(f"Topic Checks: {local_checks} local / {topic_counts['uncertain']} LLM")
+
+        limiter = st.session_state.chatbot.gemini.rate_limiter.stats()
+        st.text(f"API Queue: {limiter['queued']} waiting, "
+                f"avg wait {stats.format_time(limiter['average_wait'])}")
+
+        coalesced = st.session_state.chatbot.gemini.in_flight_stats()['coalesced']
+        if coalesced:
+            st.text(f"Coalesced Requests: {coalesced}")
+
+        speculation = st.session_state.chatbot.gemini.speculation_stats
+        if speculation['speculative']:
+            st.text(f"Speculative Generations: {speculation['speculative']} "
+                    f"({speculation['rejected'] / speculation['speculative']:.0%} rejected, "
+                    f"{speculation['wasted_generations']} wasted)")
+
+        tts_cache = st.session_state.chatbot.speech_processor.tts_cache
+        if tts_cache:
+            cache_stats = tts_cache.stats()
+            st.text(f"TTS Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+
 if show_history:
     st.sidebar.markdown("### Past Conversations")
-    # Get all conversations
-    history = st.session_state.chatbot.history_manager.get_all_conversations()
-    
-    for conv in history:
-        with st.sidebar.expander(f"Conversation from {conv['timestamp'][:16]}"):
+
+    # Search past messages without rendering the whole history
+    search_query = st.sidebar.text_input("Search conversations")
+    if search_query:
+        results = st.session_state.chatbot.history_manager.search(search_query)
+        if not results:
+            st.sidebar.caption("No matching messages")
+        for match in results:
+            role_icon = "🧑" if match['role'] == "user" else "🤖"
+            st.sidebar.markdown(f"{role_icon} *{match['timestamp'][:16]}* {match['content']}")
+            show_audio(st.sidebar, match['audio_file'])
+
+    # Render one page of conversation headers at a time; message bodies and
+    # audio are only loaded for conversations the user opens
+    # Headers already shown are kept in the session, so a rerun only fetches
+    # conversations added since the last one and "Load more" only the next page
+    history_manager = st.session_state.chatbot.history_manager
+    total_conversations = history_manager.count_conversations()
+    headers = st.session_state.get('history_headers')
+    known = st.session_state.get('history_total', 0)
+    if headers is None or total_conversations < known:
+        # First render, or conversations were deleted elsewhere: start over
+        headers = history_manager.get_conversations(0, HISTORY_PAGE_SIZE, include_messages=False)
+    elif total_conversations > known:
+        # New conversations are the newest, so they go in front
+        headers = history_manager.get_conversations(
+            0, total_conversations - known, include_messages=False
+        ) + headers
+    st.session_state.history_headers = headers
+    st.session_state.history_total = total_conversations
+
+    for header in headers:
+        timestamp = header['timestamp']
+        with st.sidebar.expander(f"Conversation from {timestamp[:16]} ({header['message_count']} messages)"):
             # Add delete button for this conversation
-            if st.button("Delete This Conversation", key=f"del_{conv['timestamp']}"):
-                if st.session_state.chatbot.history_manager.delete_conversation(conv['timestamp']):
+            if st.button("Delete This Conversation", key=f"del_{timestamp}"):
+                if history_manager.delete_conversation(timestamp):
+                    st.session_state.history_headers = [h for h in headers if h['timestamp'] != timestamp]
+                    st.session_state.history_total = total_conversations - 1
                     st.success("Conversation deleted!")
                     st.rerun()  # Refresh the page
                 else:
                     st.error("Failed to delete conversation")
-            
-            # Display conversation contents
-            for msg in conv['messages']:
-                role_icon = "🧑" if msg['role'] == "user" else "🤖"
-                st.markdown(f"{role_icon} **{msg['role'].title()}:** {msg['content']}")
-                if msg['audio_file']:
-                    st.audio(msg['audio_file'])
+
+            # Display conversation contents only once opened
+            if st.toggle("Show messages", key=f"open_{timestamp}"):
+                conv = history_manager.get_conversation(timestamp)
+                for msg in conv['messages'] if conv else []:
+                    role_icon = "🧑" if msg['role'] == "user" else "🤖"
+                    st.markdown(f"{role_icon} **{msg['role'].title()}:** {msg['content']}")
+                    show_audio(st, msg['audio_file'])
+
+    if len(headers) < total_conversations:
+        st.sidebar.caption(f"Showing {len(headers)} of {total_conversations} conversations")
+        if st.sidebar.button("Load more"):
+            st.session_state.history_headers = headers + history_manager.get_conversations(
+                len(headers), HISTORY_PAGE_SIZE, include_messages=False
+            )
+            st.rerun()
 
 user_text = st.chat_input("Or type your question here...")
 if user_text:
-    response, response_time, audio_path = st.session_state.chatbot.process_text_input(user_text)
+    # Render the answer and each synthesised sentence while they are produced;
+    # the finished turn is shown in the conversation history below
+    live = st.empty()
+    with live.container():
+        st.chat_message("user").markdown(f"**You:** {user_text}")
+        answer = st.chat_message("assistant")
+        answer_text = answer.empty()
+        shown = ""
+        for kind, payload in st.session_state.chatbot.process_text_input_stream(user_text):
+            if kind == "text":
+                shown += payload
+                answer_text.markdown(f"**AI:** {shown}▌")
+            elif kind == "audio" and payload:
+                answer.audio(payload)
+            elif kind == "done":
+                response, response_time, audio_path = payload
+    live.empty()
+
     # Show total processing time
     total_time = st.session_state.chatbot.timing_stats.last_total_time
     if total_time is not None:
@@ -84,7 +201,7 @@ if user_text:
         st.info(f"Processing time: {st.session_state.chatbot.timing_stats.format_time(response_time)}")
     
     # Show message when no audio is generated
-    if response.startswith("Rate limit") or response.startswith("I specialize"):
+    if response in (RATE_LIMIT_MESSAGE, REJECTION_MESSAGE):
         st.warning("No audio response generated for this message.")
     
     current_conversation = [
@@ -100,7 +217,11 @@ col1, col2 = st.columns(2)
 with col1:
     # If the chat is not active, show a button to start the chat
     # The button is disabled if the chat is already active
-    if st.button("Start Chat", disabled=st.session_state.chat_active):
+    # Voice input stays disabled until the speech model has warmed up
+    voice_ready = st.session_state.chatbot.voice_ready
+    if not voice_ready:
+        st.caption("Loading speech model... you can already type your question.")
+    if st.button("Start Chat", disabled=st.session_state.chat_active or not voice_ready):
         # If the button is pressed, set the chat_active flag to True
         st.session_state.chat_active = True
         # Start the chat
@@ -121,11 +242,10 @@ for entry in st.session_state.get('conversation', []):  # Iterate over each entr
         col = st.chat_message("user")
         col.markdown(f"**You:** {entry[1]}")
         if entry[2]:  # Show microphone icon for voice inputs
-            col.audio(entry[2])
+            show_audio(col, entry[2])
             col.caption("🎤 Voice input")
 
     elif entry[0] == "bot":                             # Check if the entry was made by the bot
         col = st.chat_message("assistant")
         col.markdown(f"**AI:** {entry[1]}")
-        if entry[2]:  # Only show audio for voice responses
-            col.audio(entry[2])         # Display a caption, at the buttom, with the audio file path
+        show_audio(col, entry[2])  # Only voice responses have audio
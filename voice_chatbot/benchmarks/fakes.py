@@ -0,0 +1,245 @@
+"""Local stand-ins for the external services, with configurable latency.
+
+``install_fakes`` puts fake ``google.generativeai``, ``gtts``, ``whisper``
+and ``pyaudio`` modules into ``sys.modules`` so the real application code
+runs unchanged without network access, a GPU or a microphone.
+"""
+import sys
+import time
+import types
+import random
+import threading
+import wave
+from contextlib import contextmanager
+import numpy as np
+
+RATE = 16000
+
+_ANSWER_SENTENCES = [
+    "A list in Python is an ordered, mutable collection of items.",
+    "You can reverse it in place with the reverse method, or get a reversed copy with slicing.",
+    "Here is a short example:\n```python\nitems = [1, 2, 3]\nitems.reverse()\n```",
+    "Slicing with a step of minus one creates a new list and leaves the original unchanged.",
+    "For very large lists the in-place version avoids allocating a second list.",
+    "Remember that tuples are immutable, so they only support the slicing approach.",
+    "If you only need to iterate backwards, the reversed builtin returns a lazy iterator.",
+    "That avoids copying the data at all and is usually the most efficient option.",
+]
+
+
+class _Latency:
+    """Base latency plus uniform jitter, reproducible through a seeded RNG"""
+
+    def __init__(self, seconds: float, jitter: float = 0.0, seed: int = 0):
+        self.seconds = seconds
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            offset = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.seconds + offset)
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Stand-in for ``genai.GenerativeModel``.
+
+    Validation requests (those with a ``generation_config``) answer TRUE.
+    Answers quote the prompt so different questions never share a cache
+    entry, and streaming splits the latency evenly over the chunks.
+    """
+
+    def __init__(self, latency: float = 0.8, jitter: float = 0.2, sentences: int = 6,
+                 stream_chunks: int = 5, seed: int = 0):
+        self.latency = _Latency(latency, jitter, seed)
+        self.sentences = sentences
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        body = " ".join(_ANSWER_SENTENCES[i % len(_ANSWER_SENTENCES)] for i in range(self.sentences))
+        return f"You asked: {prompt.strip()}. {body}"
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        self.calls += 1
+        if generation_config is not None:
+            time.sleep(self.latency.sample() / 4)
+            return _FakeResponse("TRUE")
+        text = self._answer(prompt)
+        if not stream:
+            time.sleep(self.latency.sample())
+            return _FakeResponse(text)
+        return self._stream(text)
+
+    def _stream(self, text: str):
+        step = max(1, -(-len(text) // self.stream_chunks))
+        delay = self.latency.sample() / self.stream_chunks
+        for i in range(0, len(text), step):
+            time.sleep(delay)
+            yield _FakeResponse(text[i:i + step])
+
+
+def _mp3_frame() -> bytes:
+    """One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, 417 bytes)"""
+    return b"\xff\xfb\x90\x00" + bytes(413)
+
+
+class FakeGTTS:
+    """Stand-in for ``gtts.gTTS`` producing valid MP3 frames after a delay"""
+
+    latency = _Latency(0.3, 0.05)
+    seconds_per_char = 0.0005
+    frames_per_char = 0.3
+
+    def __init__(self, text, lang="en", tld="com", slow=False, **kwargs):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        time.sleep(self.latency.sample() + len(self.text) * self.seconds_per_char)
+        fp.write(_mp3_frame() * max(1, int(len(self.text) * self.frames_per_char)))
+
+
+class FakeWhisperModel:
+    """Stand-in for a Whisper model whose cost grows with the audio length"""
+
+    def __init__(self, base_latency: float = 0.05, realtime_factor: float = 0.05):
+        self.base_latency = base_latency
+        self.realtime_factor = realtime_factor
+
+    def transcribe(self, audio, **kwargs):
+        seconds = len(audio) / RATE if isinstance(audio, np.ndarray) else 1.0
+        time.sleep(self.base_latency + seconds * self.realtime_factor)
+        return {
+            "text": " How do I reverse a list in Python?",
+            "language": "en",
+            "segments": [{"text": " How do I reverse a list in Python?", "end": seconds}],
+        }
+
+
+class FakeInputStream:
+    """Microphone stream replaying a fixed int16 signal, then silence"""
+
+    def __init__(self, signal: np.ndarray, realtime: bool = False):
+        self.signal = signal
+        self.realtime = realtime
+        self.cursor = 0
+        self.active = False
+        self.last_read_at = None
+
+    def start_stream(self):
+        self.cursor = 0
+        self.active = True
+
+    def stop_stream(self):
+        self.active = False
+
+    def is_active(self):
+        return self.active
+
+    def close(self):
+        self.active = False
+
+    def read(self, frames, exception_on_overflow=True):
+        if self.realtime:
+            time.sleep(frames / RATE)
+        chunk = self.signal[self.cursor:self.cursor + frames]
+        self.cursor += frames
+        if len(chunk) < frames:
+            chunk = np.concatenate([chunk, np.zeros(frames - len(chunk), dtype=np.int16)])
+        self.last_read_at = time.perf_counter()
+        return chunk.tobytes()
+
+
+class FakePyAudio:
+    """Stand-in for ``pyaudio.PyAudio`` with a single input device"""
+
+    signal = np.zeros(RATE, dtype=np.int16)
+    realtime = False
+    last_stream = None
+
+    def open(self, **kwargs):
+        FakePyAudio.last_stream = FakeInputStream(self.signal, self.realtime)
+        return FakePyAudio.last_stream
+
+    def get_host_api_info_by_index(self, index):
+        return {"deviceCount": 1}
+
+    def get_device_info_by_host_api_device_index(self, api, index):
+        return {"name": "benchmark input", "maxInputChannels": 1}
+
+    def terminate(self):
+        pass
+
+
+def synthetic_utterance(speech_seconds: float = 2.0, lead_seconds: float = 0.5,
+                        tail_seconds: float = 3.0, seed: int = 0) -> np.ndarray:
+    """Background noise, a voiced segment and enough silence to end the recording"""
+    rng = np.random.default_rng(seed)
+    total = int((lead_seconds + speech_seconds + tail_seconds) * RATE)
+    signal = rng.normal(0, 30, total)
+    start = int(lead_seconds * RATE)
+    t = np.arange(int(speech_seconds * RATE)) / RATE
+    # Syllable-like bursts: a few harmonics under a 4 Hz envelope
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    voice = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((180, 360, 720), 1))
+    signal[start:start + len(t)] += 4000 * envelope * voice
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def load_recording(path, tail_seconds: float = 3.0) -> np.ndarray:
+    """A recorded 16 kHz mono 16-bit WAV followed by silence"""
+    with wave.open(str(path), 'rb') as wf:
+        if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (RATE, 1, 2):
+            raise ValueError(f"{path} must be 16 kHz mono 16-bit PCM")
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    return np.concatenate([pcm, np.zeros(int(tail_seconds * RATE), dtype=np.int16)])
+
+
+@contextmanager
+def install_fakes(gemini_latency: float = 0.8, gemini_jitter: float = 0.2,
+                  tts_latency: float = 0.3, whisper_rtf: float = 0.05,
+                  signal: np.ndarray = None, realtime_audio: bool = False, seed: int = 0):
+    """Replace the external service modules for the duration of the block"""
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = lambda name, **kwargs: FakeGenerativeModel(
+        gemini_latency, gemini_jitter, seed=seed
+    )
+    google = sys.modules.get("google") or types.ModuleType("google")
+
+    FakeGTTS.latency = _Latency(tts_latency, tts_latency / 5, seed)
+    gtts = types.ModuleType("gtts")
+    gtts.gTTS = FakeGTTS
+
+    whisper = types.ModuleType("whisper")
+    whisper.load_model = lambda size, device=None: FakeWhisperModel(realtime_factor=whisper_rtf)
+
+    FakePyAudio.signal = synthetic_utterance(seed=seed) if signal is None else signal
+    FakePyAudio.realtime = realtime_audio
+    pyaudio = types.ModuleType("pyaudio")
+    pyaudio.PyAudio = FakePyAudio
+    pyaudio.paInt16 = 8
+    pyaudio.get_format_from_width = lambda width: 8
+
+    fakes = {"google": google, "google.generativeai": genai, "gtts": gtts,
+             "whisper": whisper, "pyaudio": pyaudio}
+    saved = {name: sys.modules.get(name) for name in fakes}
+    saved_attr = getattr(google, "generativeai", None)
+    sys.modules.update(fakes)
+    google.generativeai = genai
+    try:
+        yield
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        if saved_attr is not None:
+            google.generativeai = saved_attr
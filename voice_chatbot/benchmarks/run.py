@@ -0,0 +1,294 @@
+"""End-to-end benchmark suite with local stand-ins for Gemini, gTTS, Whisper and the microphone.
+
+Run from the ``voice_chatbot`` directory::
+
+    python -m benchmarks.run --sessions 1 4 16 --output results.json
+
+Every benchmark reports latency percentiles and, unless ``--no-memory`` is
+given, the peak Python heap measured with tracemalloc in a second pass (so
+tracing overhead does not distort the latencies). Results are written as
+JSON for comparison between runs.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+import logging
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fakes import FakePyAudio, install_fakes, load_recording  # noqa: E402
+
+
+# Error messages kept per benchmark in the results
+ERROR_SAMPLES = 5
+
+
+def summarize(values):
+    """Latency percentiles in seconds"""
+    from modules.utils import percentile
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def summarize_histogram(histogram):
+    """Latency percentiles in seconds from a LatencyHistogram"""
+    if not histogram.count:
+        return {"count": 0}
+    return {
+        "count": histogram.count,
+        "mean": histogram.mean,
+        "p50": histogram.percentile(50),
+        "p95": histogram.percentile(95),
+        "p99": histogram.percentile(99),
+        "max": histogram.max,
+    }
+
+
+def measure(workload, memory=True):
+    """Run ``workload`` for timings, then again under tracemalloc for the peak heap
+
+    ``workload`` returns a dict of results; its ``wall_time``, ``operations``
+    and optional ``errors`` entries are turned into a throughput of
+    successful operations.
+    """
+    result = workload()
+    if result.get("wall_time"):
+        result["throughput"] = (result["operations"] - result.get("errors", 0)) / result["wall_time"]
+    if memory:
+        tracemalloc.start()
+        try:
+            workload()
+            result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def bench_preprocess_text(iterations, memory=True):
+    from modules.speech import SpeechProcessor
+    from benchmarks.fakes import FakeGenerativeModel
+    processor = SpeechProcessor(tts_cache=False)
+    model = FakeGenerativeModel(sentences=12)
+
+    def workload():
+        latencies = []
+        start = time.perf_counter()
+        for i in range(iterations):
+            # Unique text, so preprocess_text's lru_cache never hits
+            text = model._answer(f"question {i} {time.perf_counter()}")
+            t = time.perf_counter()
+            processor.preprocess_text(text)
+            latencies.append(time.perf_counter() - t)
+        return {"latency": summarize(latencies), "operations": iterations,
+                "wall_time": time.perf_counter() - start}
+
+    return measure(workload, memory)
+
+
+def bench_speech_to_text(iterations, stream, memory=True):
+    from modules.speech import SpeechProcessor
+    processor = SpeechProcessor(tts_cache=False)
+    processor.warm_up(background=False)
+
+    def workload():
+        calls, after_capture = [], []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t = time.perf_counter()
+            result = processor.speech_to_text(stream=stream)
+            end = time.perf_counter()
+            if not result:
+                raise RuntimeError("No speech detected in the benchmark signal")
+            calls.append(end - t)
+            # Time from the last microphone read to the transcript
+            after_capture.append(end - FakePyAudio.last_stream.last_read_at)
+        return {"latency": summarize(calls), "stages": {"after_capture": summarize(after_capture)},
+                "operations": iterations, "wall_time": time.perf_counter() - start}
+
+    try:
+        return measure(workload, memory)
+    finally:
+        processor.close()
+
+
+def bench_process_text_input(sessions, requests_per_session, memory=True):
+    from modules.chatbot import Chatbot
+    from modules.batch import _ERROR_PREFIXES
+    from modules.rate_limiter import TokenBucketLimiter
+    from modules.utils import LatencyHistogram, TimingStats
+    bots = [Chatbot(fast_start=False) for _ in range(sessions)]
+    for bot in bots:
+        # The benchmark measures the pipeline, not the provider quota
+        bot.gemini.rate_limiter = TokenBucketLimiter(rate=1e6, burst=10 ** 6)
+        # The questions below differ only in their numbers, which the semantic tier would match
+        bot.gemini.semantic_cache = None
+    run = [0]
+
+    def workload():
+        run[0] += 1
+        for bot in bots:
+            bot.timing_stats = bot.gemini.timing_stats = TimingStats()
+        errors = []
+
+        def session(index, bot):
+            for i in range(requests_per_session):
+                # Distinct questions so no cache tier can answer
+                question = f"How do I reverse a list in Python, run {run[0]} session {index} request {i}?"
+                try:
+                    response, _, _ = bot.process_text_input(question)
+                except Exception as e:
+                    errors.append(repr(e))
+                    continue
+                # Failures the pipeline turned into a reply
+                if response.startswith(_ERROR_PREFIXES):
+                    errors.append(response)
+
+        threads = [threading.Thread(target=session, args=(i, bot)) for i, bot in enumerate(bots)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.perf_counter() - start
+
+        stages = {stage: LatencyHistogram() for stage in ("validation", "generation", "response",
+                                                           "tts", "history", "total")}
+        for bot in bots:
+            for stage, histogram in stages.items():
+                histogram.merge(bot.timing_stats.histograms[stage])
+        return {
+            "latency": summarize_histogram(stages["total"]),
+            "stages": {name: summarize_histogram(histogram) for name, histogram in stages.items()},
+            "operations": sessions * requests_per_session,
+            "wall_time": wall_time,
+            "errors": len(errors),
+            # Distinct failures in the order they first occurred
+            "error_samples": list(dict.fromkeys(errors))[:ERROR_SAMPLES],
+        }
+
+    return measure(workload, memory)
+
+
+def bench_save_conversation(backend, history_size, iterations, memory=True):
+    from modules.history_manager import HistoryManager
+    manager = HistoryManager(history_file=f"bench_{backend}_{history_size}.json", backend=backend)
+    turn = [("user", "How do I reverse a list in Python?", None),
+            ("bot", "Use list.reverse() or slicing with a step of -1." * 5, None)]
+    for _ in range(history_size):
+        manager.store.add({"timestamp": datetime.now().isoformat(),
+                           "messages": [{"role": r, "content": c, "audio_file": a} for r, c, a in turn]})
+
+    def workload():
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            t = time.perf_counter()
+            manager.save_conversation(turn)
+            latencies.append(time.perf_counter() - t)
+        return {"latency": summarize(latencies), "operations": iterations,
+                "wall_time": time.perf_counter() - start}
+
+    result = measure(workload, memory)
+    if hasattr(manager.store, "close"):
+        manager.store.close()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the voice chatbot pipeline with local fakes")
+    parser.add_argument("--output", help="JSON results file (default: benchmark_<timestamp>.json)")
+    parser.add_argument("--iterations", type=int, default=50, help="Calls per micro-benchmark")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16],
+                        help="Concurrent sessions for process_text_input")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per session")
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=[0, 1000, 10000])
+    parser.add_argument("--backends", nargs="+", default=["jsonl", "sqlite"])
+    parser.add_argument("--gemini-latency", type=float, default=0.8, help="Mean fake Gemini latency (s)")
+    parser.add_argument("--gemini-jitter", type=float, default=0.2)
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="Fake gTTS latency per chunk (s)")
+    parser.add_argument("--whisper-rtf", type=float, default=0.05,
+                        help="Fake Whisper seconds per second of audio")
+    parser.add_argument("--audio", help="16 kHz mono WAV to use instead of synthetic speech")
+    parser.add_argument("--realtime-audio", action="store_true",
+                        help="Deliver microphone chunks at real-time pace")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging")
+    args = parser.parse_args(argv)
+    memory = not args.no_memory
+
+    output = Path(args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json").resolve()
+    signal = load_recording(args.audio) if args.audio else None
+
+    # Everything the application writes (audio, history, logs) goes to a scratch directory
+    workdir = tempfile.mkdtemp(prefix="voice_chatbot_bench_")
+    os.chdir(workdir)
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.pop("GEMINI_CACHE_DB", None)
+
+    results = []
+    with install_fakes(args.gemini_latency, args.gemini_jitter, args.tts_latency, args.whisper_rtf,
+                       signal=signal, realtime_audio=args.realtime_audio, seed=args.seed):
+        import modules.speech  # noqa: F401  (configures logging)
+        if not args.verbose:
+            logging.disable(logging.INFO)
+
+        def record(name, params, result):
+            results.append({"name": name, "params": params, **result})
+            latency = result["latency"]
+            if latency["count"]:
+                print(f"{name:<28} {json.dumps(params):<44} p50 {latency['p50'] * 1000:9.2f} ms  "
+                      f"p95 {latency['p95'] * 1000:9.2f} ms  p99 {latency['p99'] * 1000:9.2f} ms")
+            else:
+                print(f"{name:<28} {json.dumps(params):<44} no successful operations")
+            if result.get("errors"):
+                print(f"  {result['errors']} of {result['operations']} operations failed, first errors:")
+                for message in result["error_samples"]:
+                    print(f"    {message}")
+
+        record("preprocess_text", {"iterations": args.iterations},
+               bench_preprocess_text(args.iterations, memory))
+        for stream in (False, True):
+            iterations = max(1, args.iterations // 10)
+            record("speech_to_text", {"stream": stream, "iterations": iterations},
+                   bench_speech_to_text(iterations, stream, memory))
+        for backend in args.backends:
+            for size in args.history_sizes:
+                record("save_conversation", {"backend": backend, "history_size": size},
+                       bench_save_conversation(backend, size, args.iterations, memory))
+        for sessions in args.sessions:
+            record("process_text_input", {"sessions": sessions, "requests": args.requests},
+                   bench_process_text_input(sessions, args.requests, memory))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": vars(args),
+        },
+        "benchmarks": results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
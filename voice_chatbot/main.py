@@ -1,5 +1,74 @@
-from modules.chatbot import Chatbot
+import sys
+import argparse
+import asyncio
+from pathlib import Path
 
-if __name__ == "__main__":
+
+def run_chat(args):
+    # Imported here so the batch commands do not need Streamlit
+    from modules.chatbot import Chatbot
     bot = Chatbot()
     bot.chat()
+
+
+def run_batch(args):
+    from modules.batch import run_batch as answer_questions
+    output = args.output or str(Path(args.input).with_suffix(".answers.jsonl"))
+    report = asyncio.run(answer_questions(
+        args.input, output, concurrency=args.concurrency,
+        audio=not args.no_audio, audio_dir=args.audio_dir
+    ))
+    print(report.format())
+    print(f"Results written to {output}")
+
+
+def run_transcribe(args):
+    from modules.batch_transcription import transcribe_directory
+    manifest = args.manifest or str(Path(args.directory) / f"transcripts_{args.model}.jsonl")
+    report = transcribe_directory(
+        args.directory, manifest, model_size=args.model, workers=args.workers,
+        pattern=args.pattern, device=args.device, fp16=args.fp16, language=args.language
+    )
+    print(report.format())
+    print(f"Transcripts written to {manifest}")
+    if report.error:
+        sys.exit(f"Transcription stopped early: {report.error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voice programming assistant")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("chat", help="Run one voice chat cycle (default)")
+
+    batch = subparsers.add_parser("batch", help="Answer questions from a JSONL or CSV file")
+    batch.add_argument("input", help="JSONL with a 'question' field per line, or CSV with a 'question' column")
+    batch.add_argument("-o", "--output", help="Output JSONL (default: <input>.answers.jsonl); "
+                                              "rerunning resumes where it stopped")
+    batch.add_argument("-c", "--concurrency", type=int, default=4, help="Questions in flight at once")
+    batch.add_argument("--no-audio", action="store_true", help="Only generate text answers")
+    batch.add_argument("--audio-dir", default="audio_history", help="Where synthesised answers are stored")
+
+    transcribe = subparsers.add_parser("transcribe", help="Transcribe a directory of recordings")
+    transcribe.add_argument("directory", help="Directory searched recursively for recordings")
+    transcribe.add_argument("--manifest", help="Output JSONL (default: <directory>/transcripts_<model>.jsonl); "
+                                               "files already in it are skipped")
+    transcribe.add_argument("-m", "--model", default="base", help="Whisper model size")
+    transcribe.add_argument("-w", "--workers", type=int, default=2,
+                            help="Worker processes, each with its own copy of the model")
+    transcribe.add_argument("--pattern", default="*.wav", help="File name pattern")
+    transcribe.add_argument("--device", help="Torch device (default: Whisper's choice)")
+    transcribe.add_argument("--fp16", action="store_true", help="Half precision inference")
+    transcribe.add_argument("--language", default="en", help="Spoken language")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        run_batch(args)
+    elif args.command == "transcribe":
+        run_transcribe(args)
+    else:
+        run_chat(args)
+
+
+if __name__ == "__main__":
+    main()
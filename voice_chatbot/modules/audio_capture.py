@@ -0,0 +1,130 @@
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger("AudioCapture")
+
+
+class AudioCaptureEngine:
+    """Long-lived microphone capture into a preallocated int16 ring buffer.
+
+    The PyAudio instance and input stream are opened once and only started
+    and stopped between turns, so a voice turn no longer pays for opening the
+    device. Samples are addressed by absolute position (samples captured since
+    ``start``); ``view`` returns zero-copy slices of the ring whenever the
+    requested range does not wrap around its end.
+    """
+
+    def __init__(self, rate=16000, channels=1, chunk=1024, sample_width=2, buffer_seconds=35):
+        """
+        Args:
+            rate: Sample rate in Hz
+            channels: Number of input channels
+            chunk: Samples per read
+            sample_width: Bytes per sample (2 for int16)
+            buffer_seconds: Ring capacity; must cover the longest recording
+        """
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.sample_width = sample_width
+        self.buffer = np.zeros(self._capacity_for(buffer_seconds), dtype=np.int16)
+        self.position = 0
+        self.device_index = None
+        self._audio = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def _capacity_for(self, seconds):
+        # A whole number of chunks, so a chunk never straddles the wrap point
+        chunks = -(-int(seconds * self.rate * self.channels) // self.chunk)
+        return max(1, chunks) * self.chunk
+
+    @property
+    def capacity(self):
+        return len(self.buffer)
+
+    def ensure_capacity(self, seconds):
+        """Grow the ring (between recordings) so it holds ``seconds`` of audio"""
+        needed = self._capacity_for(seconds)
+        if needed > self.capacity:
+            self.buffer = np.zeros(needed, dtype=np.int16)
+
+    def open(self, device_index=None):
+        """Open the device, reusing the current stream if the device is unchanged"""
+        with self._lock:
+            if self._stream is not None and device_index == self.device_index:
+                return
+            self._close_stream()
+
+            import pyaudio
+            if self._audio is None:
+                self._audio = pyaudio.PyAudio()
+            self._stream = self._audio.open(
+                format=pyaudio.get_format_from_width(self.sample_width),
+                channels=self.channels,
+                rate=self.rate,
+                input=True,
+                input_device_index=device_index,
+                frames_per_buffer=self.chunk,
+                start=False
+            )
+            self.device_index = device_index
+            logger.info("Audio input stream opened")
+
+    @property
+    def pyaudio_instance(self):
+        return self._audio
+
+    def start(self):
+        """Start capturing a new recording at position 0"""
+        self.position = 0
+        self._stream.start_stream()
+
+    def stop(self):
+        """Pause capturing; the device stays open for the next turn"""
+        if self._stream is not None and self._stream.is_active():
+            self._stream.stop_stream()
+
+    def read_chunk(self):
+        """Read one chunk into the ring and return a view of it"""
+        data = self._stream.read(self.chunk, exception_on_overflow=False)
+        samples = np.frombuffer(data, dtype=np.int16)
+        offset = self.position % self.capacity
+        view = self.buffer[offset:offset + len(samples)]
+        view[:] = samples
+        self.position += len(samples)
+        return view
+
+    def view(self, start, end):
+        """Samples between absolute positions ``start`` and ``end``.
+
+        Returns a view into the ring when the range is contiguous, otherwise
+        a copy stitched from both ends.
+        """
+        start = max(start, self.position - self.capacity, 0)
+        end = min(end, self.position)
+        if end <= start:
+            return self.buffer[:0]
+        first = start % self.capacity
+        last = first + (end - start)
+        if last <= self.capacity:
+            return self.buffer[first:last]
+        return np.concatenate((self.buffer[first:], self.buffer[:last - self.capacity]))
+
+    def _close_stream(self):
+        if self._stream is not None:
+            try:
+                self.stop()
+                self._stream.close()
+            except Exception as e:
+                logger.error(f"Error closing audio stream: {e}")
+            self._stream = None
+
+    def close(self):
+        """Release the audio device"""
+        with self._lock:
+            self._close_stream()
+            if self._audio is not None:
+                self._audio.terminate()
+                self._audio = None
@@ -0,0 +1,201 @@
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Set
+from modules.gemini import GeminiModel, REJECTION_MESSAGE, RATE_LIMIT_MESSAGE
+from modules.utils import percentile
+
+logger = logging.getLogger("BatchQA")
+
+# Interactive sessions are served before batch work in the rate limit queue
+BATCH_PRIORITY = -1
+_ERROR_PREFIXES = ("Sorry, I encountered an error", "Error:", RATE_LIMIT_MESSAGE)
+
+
+def load_questions(path) -> List[Dict[str, str]]:
+    """Read questions from a JSONL or CSV file
+
+    JSONL lines are objects with a ``question`` field; CSV files need a
+    ``question`` column. An optional ``id`` identifies the question in the
+    output; without one the hash of the question is used, so ids stay
+    stable when the file is edited and the run is resumed.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        rows = []
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logger.error(f"Skipping invalid JSON on line {line_number}: {e}")
+
+    questions = []
+    for row in rows:
+        question = (row.get("question") or "").strip()
+        if not question:
+            continue
+        question_id = str(row.get("id") or hashlib.sha256(question.encode('utf-8')).hexdigest()[:16])
+        questions.append({"id": question_id, "question": question})
+    return questions
+
+
+def load_completed(output_path) -> Set[str]:
+    """Ids already answered in an existing output file; failed ones are retried"""
+    completed = set()
+    try:
+        with open(output_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line from an interrupted run
+                if record.get("status") != "error":
+                    completed.add(record["id"])
+    except FileNotFoundError:
+        pass
+    return completed
+
+
+class BatchReport:
+    """Counts, throughput and latency percentiles of a batch run"""
+
+    def __init__(self):
+        self.answered = 0
+        self.rejected = 0
+        self.failed = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+        self.latencies: List[float] = []
+
+    @property
+    def processed(self) -> int:
+        return self.answered + self.rejected + self.failed
+
+    @property
+    def throughput(self) -> float:
+        """Questions processed per second"""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def format(self) -> str:
+        lines = [
+            f"Processed {self.processed} questions in {self.elapsed:.1f}s "
+            f"({self.throughput:.2f} questions/s), {self.skipped} already done",
+            f"  answered: {self.answered}  rejected: {self.rejected}  failed: {self.failed}",
+        ]
+        if self.latencies:
+            p50, p95, p99 = (percentile(self.latencies, q) for q in (50, 95, 99))
+            lines.append(f"  latency p50: {p50:.2f}s  p95: {p95:.2f}s  p99: {p99:.2f}s  "
+                         f"max: {max(self.latencies):.2f}s")
+        return "\n".join(lines)
+
+
+class BatchRunner:
+    """Answer a list of questions with bounded concurrency.
+
+    A fixed number of workers take questions from a queue, await
+    ``GeminiModel.generate_response_async`` (which waits on the shared rate
+    limiter) and synthesise the answer in a worker thread. Each result is
+    appended to the output JSONL and flushed as soon as it is ready, so an
+    interrupted run can be resumed and only redoes unfinished questions.
+    """
+
+    def __init__(self, gemini: GeminiModel, speech_processor=None, concurrency: int = 4):
+        """
+        Args:
+            gemini: Model used to answer the questions
+            speech_processor: SpeechProcessor for the spoken answers; None skips audio
+            concurrency: Number of questions in flight at once
+        """
+        self.gemini = gemini
+        self.speech_processor = speech_processor
+        self.concurrency = max(1, concurrency)
+
+    async def run(self, questions: List[Dict[str, str]], output_path) -> BatchReport:
+        report = BatchReport()
+        completed = load_completed(output_path)
+        pending = asyncio.Queue()
+        queued = set()
+        for item in questions:
+            if item["id"] in completed:
+                report.skipped += 1
+            elif item["id"] not in queued:  # Duplicates in the input are answered once
+                queued.add(item["id"])
+                pending.put_nowait(item)
+        logger.info(f"{pending.qsize()} questions to answer, {report.skipped} already done")
+
+        start = time.perf_counter()
+        with open(output_path, 'a', encoding='utf-8') as out:
+            async def worker():
+                while True:
+                    try:
+                        item = pending.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    record = await self._answer(item)
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    self._count(report, record)
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    async def _answer(self, item: Dict[str, str]) -> Dict:
+        start = time.perf_counter()
+        record = {"id": item["id"], "question": item["question"]}
+        answer = await self.gemini.generate_response_async(item["question"], priority=BATCH_PRIORITY)
+        record["answer"] = answer
+        record["generation_time"] = time.perf_counter() - start
+
+        if answer == REJECTION_MESSAGE:
+            record["status"] = "rejected"
+        elif not answer or answer.startswith(_ERROR_PREFIXES):
+            record["status"] = "error"
+        else:
+            record["status"] = "ok"
+
+        record["audio_file"] = None
+        if record["status"] == "ok" and self.speech_processor is not None:
+            tts_start = time.perf_counter()
+            try:
+                record["audio_file"] = await asyncio.to_thread(self.speech_processor.text_to_speech, answer)
+            except Exception as e:
+                logger.error(f"Text-to-speech failed for {item['id']}: {e}")
+            if record["audio_file"] is None:
+                record["status"] = "error"
+            record["tts_time"] = time.perf_counter() - tts_start
+
+        record["latency"] = time.perf_counter() - start
+        return record
+
+    @staticmethod
+    def _count(report: BatchReport, record: Dict) -> None:
+        if record["status"] == "ok":
+            report.answered += 1
+        elif record["status"] == "rejected":
+            report.rejected += 1
+        else:
+            report.failed += 1
+        report.latencies.append(record["latency"])
+
+
+async def run_batch(input_path, output_path, concurrency: int = 4, audio: bool = True,
+                    audio_dir: str = "audio_history") -> BatchReport:
+    """Answer every question in ``input_path`` and append the results to ``output_path``"""
+    questions = load_questions(input_path)
+    speech_processor = None
+    if audio:
+        from modules.speech import SpeechProcessor
+        speech_processor = SpeechProcessor(audio_dir=audio_dir)
+    runner = BatchRunner(GeminiModel(), speech_processor, concurrency=concurrency)
+    return await runner.run(questions, output_path)
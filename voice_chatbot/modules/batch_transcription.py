@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import wave
+import logging
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from modules.utils import percentile
+
+logger = logging.getLogger("BatchTranscription")
+
+WHISPER_RATE = 16000
+
+# Set in each worker process by _init_worker
+_worker_model = None
+_worker_language = None
+
+
+def _init_worker(model_size: str, device: Optional[str], fp16: bool,
+                 language: Optional[str], threads: int) -> None:
+    """Load Whisper once per worker process"""
+    global _worker_model, _worker_language
+    try:
+        import torch
+        # Several processes each running a full set of intra-op threads thrash the CPU
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from modules.model_registry import whisper_registry
+    _worker_model = whisper_registry.acquire(model_size, device=device, fp16=fp16)
+    _worker_language = language
+
+
+def _load_audio(path: str):
+    """Read 16 kHz mono 16-bit WAVs directly; anything else is decoded by Whisper (ffmpeg)"""
+    try:
+        with wave.open(path, 'rb') as wf:
+            if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) == (WHISPER_RATE, 1, 2):
+                pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+                return pcm.astype(np.float32) / 32768.0, len(pcm) / WHISPER_RATE
+            duration = wf.getnframes() / wf.getframerate()
+    except (wave.Error, EOFError):
+        duration = None
+    return path, duration
+
+
+def _transcribe_file(path: str) -> Dict:
+    """Transcribe one recording in a worker process"""
+    start = time.perf_counter()
+    audio, duration = _load_audio(path)
+    result = _worker_model.transcribe(audio, language=_worker_language)
+    return {
+        "text": result["text"].strip(),
+        "language": result.get("language"),
+        "duration": duration,
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def _file_key(path: Path, model_size: str) -> Tuple[str, str, int, float]:
+    stat = path.stat()
+    return str(path), model_size, stat.st_size, stat.st_mtime
+
+
+def load_manifest(manifest_path) -> set:
+    """Keys of files already transcribed: (path, model size, file size, mtime)"""
+    done = set()
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line from an interrupted run
+                if "error" not in record:
+                    done.add((record["file"], record["model"], record["size"], record["mtime"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def find_recordings(directory, pattern: str = "*.wav") -> Iterator[Path]:
+    """Recordings under ``directory`` in name order"""
+    return iter(sorted(Path(directory).rglob(pattern)))
+
+
+class TranscriptionReport:
+    """Counts, audio hours and speed of a batch transcription run"""
+
+    def __init__(self):
+        self.transcribed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.audio_seconds = 0.0
+        self.elapsed = 0.0
+        self.file_times: List[float] = []
+        # Why the run stopped early, e.g. the workers could not load the model
+        self.error: Optional[str] = None
+
+    def format(self) -> str:
+        lines = [
+            f"Transcribed {self.transcribed} files ({self.audio_seconds / 60:.1f} min of audio) "
+            f"in {self.elapsed:.1f}s, {self.failed} failed, {self.skipped} already done"
+        ]
+        if self.error:
+            lines.append(f"  Stopped: {self.error}")
+        if self.elapsed and self.audio_seconds:
+            lines.append(f"  {self.audio_seconds / self.elapsed:.1f}x real time, "
+                         f"{self.transcribed / self.elapsed:.2f} files/s")
+        if self.file_times:
+            lines.append(f"  per file p50: {percentile(self.file_times, 50):.2f}s  "
+                         f"p95: {percentile(self.file_times, 95):.2f}s")
+        return "\n".join(lines)
+
+
+def transcribe_directory(directory, manifest_path, model_size: str = "base", workers: int = 2,
+                         pattern: str = "*.wav", device: Optional[str] = None, fp16: bool = False,
+                         language: Optional[str] = "en") -> TranscriptionReport:
+    """Transcribe every recording under ``directory`` across worker processes
+
+    Each worker loads Whisper once. Results are appended to the JSONL
+    manifest as they complete; files whose path, size and modification time
+    are already in it for this model size are skipped, so an interrupted run
+    resumes and a new model size re-transcribes everything. If the worker
+    processes die (e.g. the model fails to load), every remaining file is
+    recorded as failed and ``report.error`` says why.
+    """
+    report = TranscriptionReport()
+    done = load_manifest(manifest_path)
+    workers = max(1, workers)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    start = time.perf_counter()
+    with open(manifest_path, 'a', encoding='utf-8') as manifest, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_size, device, fp16, language, threads)
+    ) as pool:
+        in_flight = {}
+
+        def write(path, size, mtime, result: Optional[Dict] = None, error: Optional[str] = None) -> None:
+            record = {"file": path, "model": model_size, "size": size, "mtime": mtime}
+            if error is None:
+                record.update(result)
+                report.transcribed += 1
+                report.audio_seconds += record["duration"] or 0.0
+                report.file_times.append(record["elapsed"])
+            else:
+                record["error"] = error
+                report.failed += 1
+            manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            manifest.flush()
+
+        def pool_broken(e: BrokenProcessPool) -> str:
+            if report.error is None:
+                report.error = f"Worker processes stopped: {e}"
+                logger.error(f"{report.error}; marking the remaining files as failed")
+            return report.error
+
+        def collect(future) -> None:
+            path, size, mtime = in_flight.pop(future)
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                write(path, size, mtime, error=pool_broken(e))
+            except Exception as e:
+                logger.error(f"Transcription of {path} failed: {e}")
+                write(path, size, mtime, error=str(e))
+            else:
+                write(path, size, mtime, result)
+
+        for path in find_recordings(directory, pattern):
+            key = _file_key(path, model_size)
+            if key in done:
+                report.skipped += 1
+                continue
+            if report.error:
+                # No workers left; record the file so the next run retries it
+                write(key[0], key[2], key[3], error=report.error)
+                continue
+            # Keep a couple of files queued per worker rather than the whole archive
+            while len(in_flight) >= workers * 2:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future)
+            try:
+                in_flight[pool.submit(_transcribe_file, str(path))] = (key[0], key[2], key[3])
+            except BrokenProcessPool as e:
+                write(key[0], key[2], key[3], error=pool_broken(e))
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                collect(future)
+
+    report.elapsed = time.perf_counter() - start
+    return report
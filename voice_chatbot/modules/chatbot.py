@@ -1,90 +1,113 @@
 from modules.speech import SpeechProcessor
-from modules.gemini import GeminiModel
+from modules.gemini import GeminiModel, RATE_LIMIT_MESSAGE, REJECTION_MESSAGE
 from modules.history_manager import HistoryManager
-from modules.utils import TimingStats, measure_time
+from modules.utils import TimingStats, SentenceSplitter, measure_time
+from modules import tracing
 import streamlit as st
 import time
+import asyncio
+import queue
+import threading
 import logging
 
+# Ends the stream of synthesised sentences; a failed sentence is queued as None
+_DONE = object()
+
+
 class Chatbot:
-    def __init__(self):
+    def __init__(self, fast_start=True):
+        """
+        Args:
+            fast_start: Load Whisper and the Gemini SDK in background threads so
+                text input is usable immediately. If False, both are loaded
+                before the constructor returns.
+        """
         with measure_time() as get_startup_time:
+            self.timing_stats = TimingStats()
             self.speech_processor = SpeechProcessor()
-            self.gemini = GeminiModel()
+            self.gemini = GeminiModel(timing_stats=self.timing_stats)
             self.history_manager = HistoryManager()
-            self.timing_stats = TimingStats()
             self._init_session_state()
+
+            if fast_start:
+                self.gemini.warm_up()
+                self.speech_processor.warm_up()
+            else:
+                self.gemini.warm_up().join()
+                self.speech_processor.warm_up(background=False)
             
         self.timing_stats.startup_time = get_startup_time()
         print(f"Startup time: {self.timing_stats.format_time(self.timing_stats.startup_time)}")
 
+    @property
+    def voice_ready(self):
+        """True once the speech model has finished warming up"""
+        return self.speech_processor.is_ready
+
     def _init_session_state(self):
         if 'conversation' not in st.session_state:
             st.session_state.conversation = []
 
-    def chat(self):
-        """Handle single interaction cycle"""
-        with measure_time() as get_response_time:
-            result = self.speech_processor.speech_to_text()
-            
-            if result and result["text"]:
-                user_input = result["text"]
-                audio_path = result["audio_file"]
-
-                response = self.gemini.generate_response(user_input)
-                response_audio = None
-                if not response.startswith("Rate limit") and not response.startswith("I specialize"):
-                    response_audio = self.speech_processor.text_to_speech(response)
-                
-                current_conversation = [
-                    ("user", user_input, audio_path),
-                    ("bot", response, response_audio)
-                ]
-                
-                self.history_manager.save_conversation(current_conversation)
-                st.session_state.conversation.extend(current_conversation)
-        
-        response_time = get_response_time()
-        self.timing_stats.last_response_time = response_time
-        self.timing_stats.response_times.append(response_time)
+    @tracing.traced("chatbot.turn", root=True, mode="voice")
+    def chat(self, stream_transcription=False, on_partial=None):
+        """Handle single interaction cycle
+
+        Args:
+            stream_transcription: Transcribe while recording instead of afterwards
+            on_partial: Called with partial transcripts when streaming
+        """
+        result = self.speech_processor.speech_to_text(
+            stream=stream_transcription, on_partial=on_partial
+        )
+        if not result or not result["text"]:
+            return
+
+        # Total runs from the end of the recording to the saved, spoken answer
+        self.timing_stats.record("transcription", result["transcription_time"])
+        with measure_time() as get_turn_time:
+            user_input = result["text"]
+            audio_path = result["audio_file"]
+
+            response, _ = self._generate(user_input)
+            response_audio, _ = self._synthesise(response)
+
+            current_conversation = [
+                ("user", user_input, audio_path),
+                ("bot", response, response_audio)
+            ]
+
+            self._save_history(current_conversation)
+            st.session_state.conversation.extend(current_conversation)
+
+        self.timing_stats.record("total", result["transcription_time"] + get_turn_time())
+        self._annotate_turn(user_input, response, response_audio)
     
     def stop_chat(self):
         self.speech_processor.cleanup()
         st.session_state.chat_active = False
     
+    @tracing.traced("chatbot.turn", root=True, mode="text")
     def process_text_input(self, text: str):
         """Handle direct text input"""
         if not text.strip():
             return "Please enter a valid question", 0, None
         
-        total_start_time = time.time()
-        
-        # Generate text response
-        with measure_time() as get_response_time:
-            response = self.gemini.generate_response(text)
-        
-        response_time = get_response_time()
-        self.timing_stats.last_response_time = response_time
-        self.timing_stats.response_times.append(response_time)
-        
-        # Generate audio
-        audio_path = None
-        if response and not response.startswith("Rate limit") and not response.startswith("I specialize"):
-            with measure_time() as get_audio_time:
-                audio_path = self.speech_processor.text_to_speech(response)
-            
-            audio_time = get_audio_time()
-            self.timing_stats.last_audio_time = audio_time
-            self.timing_stats.audio_times.append(audio_time)
-        else:
-            audio_time = 0
-            self.timing_stats.last_audio_time = audio_time
-            self.timing_stats.audio_times.append(audio_time)
-        
-        # Calculate total time
-        total_time = time.time() - total_start_time
-        self.timing_stats.last_total_time = total_time
-        self.timing_stats.total_times.append(total_time)
+        with measure_time() as get_total_time:
+            # Generate text response
+            response, response_time = self._generate(text)
+
+            # Generate audio
+            audio_path, audio_time = self._synthesise(response)
+
+            current_conversation = [
+                ("user", text, None),
+                ("bot", response, audio_path)
+            ]
+            self._save_history(current_conversation)
+
+        total_time = get_total_time()
+        self.timing_stats.record("total", total_time)
+        self._annotate_turn(text, response, audio_path)
         
         # Log timing information
         logger = logging.getLogger(__name__)
@@ -92,10 +115,268 @@ class Chatbot:
         logger.info(f"Audio generation time: {audio_time:.2f}s")
         logger.info(f"Total processing time: {total_time:.2f}s")
         
+        return response, response_time, audio_path
+
+    @tracing.traced("chatbot.turn", root=True, mode="text")
+    async def process_text_input_async(self, text: str):
+        """Asynchronous version of process_text_input.
+
+        The model is awaited on the event loop while TTS and the history
+        write run in worker threads, so many conversations can be served
+        concurrently from one process.
+        """
+        if not text.strip():
+            return "Please enter a valid question", 0, None
+
+        with measure_time() as get_total_time:
+            response, response_time = await self._generate_async(text)
+            audio_path, audio_time = await self._synthesise_async(response)
+
+            current_conversation = [
+                ("user", text, None),
+                ("bot", response, audio_path)
+            ]
+            await self._save_history_async(current_conversation)
+
+        total_time = get_total_time()
+        self.timing_stats.record("total", total_time)
+        self._annotate_turn(text, response, audio_path)
+
+        logger = logging.getLogger(__name__)
+        logger.info(f"Response generation time: {response_time:.2f}s")
+        logger.info(f"Audio generation time: {audio_time:.2f}s")
+        logger.info(f"Total processing time: {total_time:.2f}s")
+
+        return response, response_time, audio_path
+
+    @tracing.traced("chatbot.turn", root=True, mode="voice")
+    async def chat_async(self, stream_transcription=False, on_partial=None):
+        """Asynchronous version of chat
+
+        Recording and Whisper run in a worker thread; the rest follows
+        process_text_input_async.
+
+        Returns:
+            The (user, bot) messages of the turn, or None if nothing was heard
+        """
+        result = await asyncio.to_thread(
+            self.speech_processor.speech_to_text,
+            stream=stream_transcription, on_partial=on_partial
+        )
+        if not result or not result["text"]:
+            return None
+
+        # Total runs from the end of the recording to the saved, spoken answer
+        self.timing_stats.record("transcription", result["transcription_time"])
+        with measure_time() as get_turn_time:
+            user_input = result["text"]
+            response, _ = await self._generate_async(user_input)
+            response_audio, _ = await self._synthesise_async(response)
+
+            current_conversation = [
+                ("user", user_input, result["audio_file"]),
+                ("bot", response, response_audio)
+            ]
+            await self._save_history_async(current_conversation)
+        self.timing_stats.record("total", result["transcription_time"] + get_turn_time())
+        self._annotate_turn(user_input, response, response_audio)
+
+        st.session_state.conversation.extend(current_conversation)
+        return current_conversation
+
+    @staticmethod
+    def _annotate_turn(question: str, response: str, audio_path) -> None:
+        tracing.current_span().update(prompt_chars=len(question), response_chars=len(response),
+                                      spoken=audio_path is not None)
+
+    def _generate(self, text: str):
+        """Ask the model and record the response time"""
+        with measure_time() as get_response_time:
+            response = self.gemini.generate_response(text)
+        response_time = get_response_time()
+        self.timing_stats.record("response", response_time)
+        return response, response_time
+
+    def _synthesise(self, response: str):
+        """Synthesise speech for a response and record the TTS time
+
+        Returns:
+            (audio_path, audio_time); no audio for rejections and rate limit replies
+        """
+        if not self._should_speak(response):
+            self.timing_stats.last_audio_time = None
+            return None, 0
+        with measure_time() as get_audio_time:
+            audio_path = self.speech_processor.text_to_speech(response)
+        audio_time = get_audio_time()
+        self.timing_stats.record("tts", audio_time)
+        return audio_path, audio_time
+
+    def _save_history(self, conversation):
+        with measure_time() as get_history_time:
+            self.history_manager.save_conversation(conversation)
+        self.timing_stats.record("history", get_history_time())
+
+    async def _generate_async(self, text: str):
+        """Await the model and record the response time"""
+        with measure_time() as get_response_time:
+            response = await self.gemini.generate_response_async(text)
+        response_time = get_response_time()
+        self.timing_stats.record("response", response_time)
+        return response, response_time
+
+    async def _synthesise_async(self, response: str):
+        """Synthesise speech for a response in a worker thread
+
+        Returns:
+            (audio_path, audio_time); no audio for rejections and rate limit replies
+        """
+        if not self._should_speak(response):
+            self.timing_stats.last_audio_time = None
+            return None, 0
+        with measure_time() as get_audio_time:
+            audio_path = await asyncio.to_thread(self.speech_processor.text_to_speech, response)
+        audio_time = get_audio_time()
+        self.timing_stats.record("tts", audio_time)
+        return audio_path, audio_time
+
+    async def _save_history_async(self, conversation):
+        with measure_time() as get_history_time:
+            await asyncio.to_thread(self.history_manager.save_conversation, conversation)
+        self.timing_stats.record("history", get_history_time())
+
+    @tracing.traced("chatbot.turn", root=True, mode="stream")
+    def process_text_input_stream(self, text: str):
+        """Handle direct text input, streaming the answer as it is generated.
+
+        The response is split into sentences while Gemini is still generating
+        and each sentence is synthesised by a background TTS worker, so the
+        first audio is ready long before the full answer.
+
+        Yields:
+            ("text", chunk) for each piece of generated text,
+            ("audio", path) for each synthesised sentence, in order, and finally
+            ("done", (response, response_time, audio_path)) with the combined audio
+        """
+        if not text.strip():
+            yield ("done", ("Please enter a valid question", 0, None))
+            return
+
+        total_start_time = time.perf_counter()
+        sentences = queue.Queue()
+        audio_parts = queue.Queue()
+        stopped = threading.Event()
+
+        def synthesise():
+            while True:
+                sentence = sentences.get()
+                if sentence is None or stopped.is_set():
+                    break
+                audio_parts.put(self.speech_processor.text_to_speech(sentence))
+            audio_parts.put(_DONE)
+
+        splitter = SentenceSplitter()
+        chunks = []
+        parts = []
+        speak = None
+        first_audio_time = None
+
+        def queue_sentence(sentence):
+            # Sentences that are only code or formatting have nothing to say
+            if self.speech_processor.preprocess_text(sentence).strip():
+                sentences.put(sentence)
+
+        worker = threading.Thread(target=tracing.wrap(synthesise), name="tts-pipeline", daemon=True)
+        worker.start()
+        try:
+            # Generate text response
+            with measure_time() as get_response_time:
+                for chunk in self.gemini.generate_response_stream(text):
+                    chunks.append(chunk)
+                    yield ("text", chunk)
+
+                    # Rejections and errors arrive as a single first chunk
+                    if speak is None:
+                        speak = self._should_speak(chunk)
+                    if speak:
+                        for sentence in splitter.feed(chunk):
+                            queue_sentence(sentence)
+
+                    # Hand over any sentence audio that is already done
+                    while True:
+                        try:
+                            path = audio_parts.get_nowait()
+                        except queue.Empty:
+                            break
+                        if path is _DONE:
+                            break
+                        if path is None:
+                            continue  # Synthesis failed; the sentence stays text only
+                        if first_audio_time is None:
+                            first_audio_time = time.perf_counter() - total_start_time
+                        parts.append(path)
+                        yield ("audio", path)
+
+            response_time = get_response_time()
+            self.timing_stats.record("response", response_time)
+            response = "".join(chunks)
+
+            # Wait for the remaining sentences to be synthesised
+            with measure_time() as get_audio_time:
+                if speak:
+                    rest = splitter.flush()
+                    if rest:
+                        queue_sentence(rest)
+                sentences.put(None)
+                while True:
+                    path = audio_parts.get()
+                    if path is _DONE:
+                        break
+                    if path is None:
+                        continue
+                    if first_audio_time is None:
+                        first_audio_time = time.perf_counter() - total_start_time
+                    parts.append(path)
+                    yield ("audio", path)
+                audio_path = self.speech_processor.combine_audio(parts)
+        finally:
+            # Also reached when the consumer abandons the stream (e.g. a Streamlit
+            # rerun), so the worker does not wait for sentences forever
+            stopped.set()
+            sentences.put(None)
+            worker.join()
+
+        # Only the synthesis left after generation ended; the rest overlapped it
+        if parts:
+            self.timing_stats.record("tts", get_audio_time())
+        else:
+            self.timing_stats.last_audio_time = None
+        if first_audio_time is not None:
+            self.timing_stats.record("first_audio", first_audio_time)
+            tracing.current_span().set("first_audio_ms", first_audio_time * 1000)
+        else:
+            self.timing_stats.last_first_audio_time = None
+
         current_conversation = [
             ("user", text, None),
             ("bot", response, audio_path)
         ]
-        self.history_manager.save_conversation(current_conversation)
-        
-        return response, response_time, audio_path
+        self._save_history(current_conversation)
+
+        total_time = time.perf_counter() - total_start_time
+        self.timing_stats.record("total", total_time)
+        self._annotate_turn(text, response, audio_path)
+        tracing.current_span().set("audio_parts", len(parts))
+
+        logger = logging.getLogger(__name__)
+        logger.info(f"Response generation time: {response_time:.2f}s")
+        if first_audio_time is not None:
+            logger.info(f"Time to first audio: {first_audio_time:.2f}s")
+        logger.info(f"Total processing time: {total_time:.2f}s")
+
+        yield ("done", (response, response_time, audio_path))
+
+    @staticmethod
+    def _should_speak(response: str) -> bool:
+        """Rate limit and off-topic replies get no audio"""
+        return bool(response) and response not in (RATE_LIMIT_MESSAGE, REJECTION_MESSAGE)
@@ -1,10 +1,18 @@
-import time
 import logging
 import asyncio
-from typing import Optional, Dict, Any
-import google.generativeai as genai
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterator, Tuple
 import os
+import time
 from dotenv import load_dotenv
+from modules.response_cache import ResponseCache, SqliteResponseCache, normalize_prompt
+from modules.semantic_cache import SemanticCache
+from modules.topic_classifier import get_topic_classifier
+from modules.rate_limiter import get_rate_limiter
+from modules.single_flight import LeaderAbandoned, SingleFlight
+from modules.utils import measure_time
+from modules import tracing
 from datetime import datetime, timedelta
 
 # Set up logging
@@ -16,74 +24,203 @@ load_dotenv()
 
 # Configuration
 API_KEY = os.getenv("GEMINI_API_KEY")
-RATE_LIMIT_SECONDS = 2
+# Provider quota, shared by every session in the process
+RATE_LIMIT_PER_MINUTE = float(os.getenv("GEMINI_RATE_LIMIT_RPM", "30"))
+RATE_LIMIT_BURST = int(os.getenv("GEMINI_RATE_LIMIT_BURST", "3"))
+# Longest a request waits in the queue before giving up
+RATE_LIMIT_MAX_WAIT_SECONDS = 30
+RATE_LIMIT_MESSAGE = "Rate limit reached: the assistant is busy, please try again in a moment."
+# Validation calls are short and block a waiting user, so they jump the queue
+VALIDATION_PRIORITY = 1
 MODEL_NAME = "models/gemini-1.5-flash"
 VALIDATION_MODEL_NAME = "models/gemini-1.5-flash"  # Can use a smaller model for validation if available
+CACHE_MAX_ENTRIES = 1000
+CACHE_MAX_BYTES = 10 * 1024 * 1024
+CACHE_TTL_SECONDS = 24 * 3600
+# Optional SQLite file shared by all worker processes; unset keeps the cache in memory only
+PERSISTENT_CACHE_PATH = os.getenv("GEMINI_CACHE_DB")
+PERSISTENT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+CACHE_WARM_ENTRIES = 500
+# Cosine similarity above which a paraphrased prompt reuses a cached answer.
+# Off by default: bag-of-n-gram similarity cannot tell "list vs tuple" from
+# "list vs set", or "string to int" from "int to string", so enable it only
+# with a threshold checked against your own questions.
+SEMANTIC_CACHE_THRESHOLD = os.getenv("GEMINI_SEMANTIC_THRESHOLD", "off")
+# Start generating while the LLM validates an ambiguous question ("0" disables)
+SPECULATIVE_GENERATION = os.getenv("GEMINI_SPECULATIVE", "1") not in ("0", "false", "off")
+SPECULATIVE_MAX_WORKERS = 4
+REJECTION_MESSAGE = "I specialize in programming help. Please ask me about code-related topics!"
+
+_speculation_pool = ThreadPoolExecutor(max_workers=SPECULATIVE_MAX_WORKERS,
+                                       thread_name_prefix="gemini-speculative")
+# One slot per worker: a speculative call that would have to queue behind
+# other sessions' calls is not worth making
+_speculation_slots = threading.BoundedSemaphore(SPECULATIVE_MAX_WORKERS)
+# Identical questions asked at the same time by different sessions share one upstream call
+_in_flight = SingleFlight()
 
 class GeminiModel:
-    def __init__(self, api_key: Optional[str] = None, model_name: str = MODEL_NAME):
+    def __init__(self, api_key: Optional[str] = None, model_name: str = MODEL_NAME,
+                 cache_path: Optional[str] = PERSISTENT_CACHE_PATH,
+                 semantic_threshold: Optional[float] = None,
+                 speculative: bool = SPECULATIVE_GENERATION, timing_stats=None):
         """Initialize the Gemini model with API key and configuration.
         
         Args:
             api_key: Optional API key override. If None, uses environment variable.
             model_name: The Gemini model to use.
+            cache_path: SQLite file for a response cache shared across processes
+                and restarts. If None, responses are only cached in memory.
+            semantic_threshold: Similarity threshold for the semantic cache.
+                Defaults to GEMINI_SEMANTIC_THRESHOLD; the tier is off unless set.
+            speculative: Run generation concurrently with LLM validation and
+                discard it if the question is rejected.
+            timing_stats: TimingStats receiving the validation and generation
+                latencies of uncached requests.
         """
         self.api_key = api_key or API_KEY
         if not self.api_key:
             raise ValueError("Missing API key! Set GEMINI_API_KEY in the .env file or pass it to the constructor.")
         
-        # Configure the API
-        genai.configure(api_key=self.api_key)
+        # Models are created on first use (or by warm_up) because importing
+        # google.generativeai dominates startup time
+        self.model_name = model_name
+        self._model = None
+        self._validation_model = None
+        self._init_lock = threading.Lock()
         
-        # Initialize models
-        self.model = genai.GenerativeModel(model_name)
-        self.validation_model = genai.GenerativeModel(VALIDATION_MODEL_NAME)
+        # Token bucket shared by every GeminiModel in the process; requests
+        # queue for a permit instead of being rejected
+        self.rate_limiter = get_rate_limiter("gemini", RATE_LIMIT_PER_MINUTE / 60.0, RATE_LIMIT_BURST)
         
-        # Rate limiting
-        self.last_call_time = 0
-        self.rate_limit_seconds = RATE_LIMIT_SECONDS
-        
-        # Request cache to avoid duplicate requests - now without size limit
-        self.cache: Dict[str, str] = {}
+        # Bounded LRU/TTL cache keyed on the normalised prompt
+        self.cache = ResponseCache(
+            max_entries=CACHE_MAX_ENTRIES,
+            max_bytes=CACHE_MAX_BYTES,
+            ttl_seconds=CACHE_TTL_SECONDS
+        )
+
+        # Optional offline similarity index so slightly different transcripts
+        # of the same question still hit
+        if semantic_threshold is None and SEMANTIC_CACHE_THRESHOLD.lower() not in ("", "0", "off"):
+            semantic_threshold = float(SEMANTIC_CACHE_THRESHOLD)
+        # Same budget and lifetime as the exact-match tier
+        self.semantic_cache = SemanticCache(
+            threshold=semantic_threshold,
+            max_entries=CACHE_MAX_ENTRIES,
+            max_bytes=CACHE_MAX_BYTES,
+            ttl_seconds=CACHE_TTL_SECONDS
+        ) if semantic_threshold else None
+
+        # Decides most validations locally so only ambiguous questions cost an LLM call
+        self.topic_classifier = get_topic_classifier()
+
+        # Speculative generation: accepted questions pay max(validation, generation)
+        # instead of the sum, rejected ones may waste a generation call
+        self.speculative = speculative
+        self.speculation_stats = {"speculative": 0, "rejected": 0, "wasted_generations": 0}
+        self._stats_lock = threading.Lock()
+
+        self.timing_stats = timing_stats
+
+        # Persistent second tier, warmed into memory so popular answers hit immediately
+        self.persistent_cache = None
+        if cache_path:
+            self.persistent_cache = SqliteResponseCache(cache_path, ttl_seconds=PERSISTENT_CACHE_TTL_SECONDS)
+            warmed = self.persistent_cache.warm(self.cache, limit=CACHE_WARM_ENTRIES)
+            logger.info(f"Warmed response cache with {warmed} entries from {cache_path}")
         
         logger.info(f"Initialized GeminiModel with model: {model_name}")
 
-    async def generate_response_async(self, prompt: str) -> str:
-        """Asynchronous version of generate_response."""
-        # Check cache first
-        if prompt in self.cache:
-            logger.info("Returning cached response")
-            return self.cache[prompt]
-            
-        # Rate limiting check
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_call_time
-        
-        if time_since_last_call < self.rate_limit_seconds:
-            wait_time = self.rate_limit_seconds - time_since_last_call
-            logger.info(f"Rate limiting: waiting for {wait_time:.2f} seconds")
-            await asyncio.sleep(wait_time)
+    def _init_models(self) -> None:
+        """Import the SDK, configure it and create the generation and validation models."""
+        with self._init_lock:
+            if self._model is not None:
+                return
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._validation_model = genai.GenerativeModel(VALIDATION_MODEL_NAME)
+            self._model = genai.GenerativeModel(self.model_name)
+
+    @property
+    def model(self):
+        """The generation model, created on first access."""
+        if self._model is None:
+            self._init_models()
+        return self._model
+
+    @property
+    def validation_model(self):
+        """The validation model, created on first access."""
+        if self._model is None:
+            self._init_models()
+        return self._validation_model
+
+    def warm_up(self) -> threading.Thread:
+        """Import the SDK and create the models in a background thread.
         
-        self.last_call_time = time.time()
+        Returns:
+            The started daemon thread.
+        """
+        thread = threading.Thread(target=self._init_models, name="gemini-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    async def generate_response_async(self, prompt: str, priority: int = 0) -> str:
+        """Asynchronous version of generate_response."""
+        with tracing.span("gemini.generate", prompt_chars=len(prompt), priority=priority):
+            # Check cache first
+            cached_response = self._get_from_cache(prompt)
+            if cached_response:
+                logger.info("Returning cached response")
+                return cached_response
+
+            return await _in_flight.do_async(self._flight_key(prompt),
+                                             lambda: self._generate_uncached_async(prompt, priority))
+
+    async def _generate_uncached_async(self, prompt: str, priority: int) -> str:
+        """Rate limit, validate and call the model for a prompt that missed the cache."""
+        # Wait for a permit without blocking the event loop
+        with tracing.span("gemini.rate_limit", priority=priority) as span:
+            granted = await self.rate_limiter.acquire_async(priority, timeout=RATE_LIMIT_MAX_WAIT_SECONDS)
+            span.set("granted", granted)
+        if not granted:
+            logger.warning(f"Rate limit queue timed out after {RATE_LIMIT_MAX_WAIT_SECONDS}s")
+            return RATE_LIMIT_MESSAGE
         
-        # Run validation in a separate thread to not block
-        is_valid = await asyncio.to_thread(self._validate_question, prompt)
+        with measure_time() as get_validation_time, tracing.span("gemini.validate") as span:
+            is_valid, probability = self._validate_locally(prompt)
+            generation = None
+            if is_valid is None:
+                generation = self._start_speculation(prompt)
+                # Run validation in a separate thread to not block
+                is_valid = await asyncio.to_thread(self._validate_with_llm, prompt, probability)
+                generation = self._settle_speculation(generation, is_valid)
+            span.update(valid=is_valid, speculative=generation is not None)
+        self._record_timing("validation", get_validation_time())
         
         if not is_valid:
             logger.warning(f"Invalid question rejected: {prompt[:50]}...")
-            return "I specialize in programming help. Please ask me about code-related topics!"
+            return REJECTION_MESSAGE
 
         try:
-            # Call the Gemini model
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
-            )
+            # Call the Gemini model (or collect the speculative call)
+            with measure_time() as get_generation_time, tracing.span(
+                "gemini.generate_content", speculative=generation is not None
+            ) as span:
+                if generation is not None:
+                    response = await asyncio.wrap_future(generation)
+                else:
+                    response = await asyncio.to_thread(
+                        self.model.generate_content,
+                        prompt
+                    )
+                result = response.text if response else None
+                span.set("response_chars", len(result or ""))
+            self._record_timing("generation", get_generation_time())
             
             if not response:
                 return "Error: No response generated."
-                
-            result = response.text
             
             # Cache the result
             self._update_cache(prompt, result)
@@ -92,49 +229,53 @@ class GeminiModel:
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
+            tracing.current_span().set("error", str(e))
             return f"Sorry, I encountered an error: {str(e)}"
 
-    def generate_response(self, prompt: str) -> str:
+    def generate_response(self, prompt: str, priority: int = 0) -> str:
         """Generate a response using the Gemini model.
         
         Args:
             prompt: The text prompt to send to the model.
+            priority: Position in the rate limit queue; higher is served first.
             
         Returns:
             The model's response as a string.
         """
-        # Check cache first
-        cached_response = self._get_from_cache(prompt)
-        if cached_response:
-            logger.info("Returning cached response")
-            return cached_response
-        
-        # Rate limiting check
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_call_time
-        
-        if time_since_last_call < self.rate_limit_seconds:
-            logger.info(f"Rate limiting triggered: {time_since_last_call:.2f}s since last call")
-            return f"Please wait {self.rate_limit_seconds - time_since_last_call:.1f} seconds before making another request."
-        
-        self.last_call_time = current_time
-        
-        # Validate the question
-        if not self._validate_question(prompt):
-            logger.info(f"Question validation failed: {prompt[:50]}...")
-            return "I specialize in programming help. Please ask me about code-related topics!"
+        with tracing.span("gemini.generate", prompt_chars=len(prompt), priority=priority):
+            # Check cache first
+            cached_response = self._get_from_cache(prompt)
+            if cached_response:
+                logger.info("Returning cached response")
+                return cached_response
+
+            return _in_flight.do(self._flight_key(prompt), lambda: self._generate_uncached(prompt, priority))
+
+    def _generate_uncached(self, prompt: str, priority: int) -> str:
+        """Rate limit, validate and call the model for a prompt that missed the cache."""
+        # Rate limiting and validation
+        rejection, generation = self._check_request(prompt, priority=priority)
+        if rejection:
+            return rejection
 
         try:
-            # Call the Gemini model
-            logger.info(f"Sending prompt to Gemini: {prompt[:50]}...")
-            response = self.model.generate_content(prompt)
+            # Call the Gemini model (or collect the speculative call)
+            with measure_time() as get_generation_time, tracing.span(
+                "gemini.generate_content", speculative=generation is not None
+            ) as span:
+                if generation is not None:
+                    response = generation.result()
+                else:
+                    logger.info(f"Sending prompt to Gemini: {prompt[:50]}...")
+                    response = self.model.generate_content(prompt)
+                # Ensure we return a string
+                result = (response.text if hasattr(response, 'text') else str(response)) if response else None
+                span.set("response_chars", len(result or ""))
+            self._record_timing("generation", get_generation_time())
             
             if not response:
                 logger.warning("Empty response received from Gemini")
                 return "Error: No response generated."
-                
-            # Ensure we return a string
-            result = response.text if hasattr(response, 'text') else str(response)
             
             # Cache the result
             self._update_cache(prompt, result)
@@ -143,34 +284,218 @@ class GeminiModel:
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
+            tracing.current_span().set("error", str(e))
             return f"Sorry, I encountered an error: {str(e)}"
     
-    def _validate_question(self, text: str) -> bool:
-        """Validate if the question is related to programming.
+    def generate_response_stream(self, prompt: str, priority: int = 0) -> Iterator[str]:
+        """Generate a response using the Gemini model's streaming mode.
+        
+        Cached answers, rate limit and validation messages and errors are
+        yielded as a single chunk.
+        
+        Args:
+            prompt: The text prompt to send to the model.
+            priority: Position in the rate limit queue; higher is served first.
+            
+        Yields:
+            Pieces of the response text as they arrive.
+        """
+        with tracing.span("gemini.generate", prompt_chars=len(prompt), priority=priority, stream=True):
+            yield from self._generate_stream(prompt, priority)
+
+    def _generate_stream(self, prompt: str, priority: int) -> Iterator[str]:
+        """Cache lookup and coalescing for generate_response_stream."""
+        # Check cache first
+        cached_response = self._get_from_cache(prompt)
+        if cached_response:
+            logger.info("Returning cached response")
+            yield cached_response
+            return
+
+        key = self._flight_key(prompt)
+        while True:
+            flight, leader = _in_flight.join(key)
+            if leader:
+                break
+            # Someone is already asking this; wait for their complete answer
+            try:
+                yield flight.result()
+                return
+            except LeaderAbandoned:
+                continue
+
+        chunks = []
+        completed = False
+        try:
+            for text in self._stream_uncached(prompt, priority):
+                chunks.append(text)
+                yield text
+            completed = True
+        finally:
+            if completed:
+                _in_flight.finish(key, flight, "".join(chunks))
+            else:
+                # The consumer stopped early; waiters must not get a partial answer
+                _in_flight.abandon(key, flight)
+
+    def _stream_uncached(self, prompt: str, priority: int) -> Iterator[str]:
+        """Rate limit, validate and stream the model's answer for a prompt that missed the cache."""
+        # Rate limiting and validation
+        rejection, generation = self._check_request(prompt, stream=True, priority=priority)
+        if rejection:
+            yield rejection
+            return
+
+        parts = []
+        # Generation time covers the whole stream, not just the first chunk
+        generation_start = time.perf_counter()
+        with tracing.span("gemini.generate_content", speculative=generation is not None,
+                          stream=True) as span:
+            try:
+                if generation is not None:
+                    stream = generation.result()
+                else:
+                    logger.info(f"Streaming prompt to Gemini: {prompt[:50]}...")
+                    stream = self.model.generate_content(prompt, stream=True)
+                for chunk in stream:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunks without text parts (e.g. only safety metadata)
+                        continue
+                    if text:
+                        if not parts:
+                            span.set("first_chunk_ms", (time.perf_counter() - generation_start) * 1000)
+                        parts.append(text)
+                        yield text
+            except Exception as e:
+                logger.error(f"Error streaming response: {e}")
+                span.set("error", str(e))
+                yield f"Sorry, I encountered an error: {str(e)}"
+                return
+            finally:
+                span.update(chunks=len(parts), response_chars=sum(map(len, parts)))
+
+        self._record_timing("generation", time.perf_counter() - generation_start)
+
+        if not parts:
+            logger.warning("Empty response received from Gemini")
+            yield "Error: No response generated."
+            return
+
+        # Cache the complete result
+        self._update_cache(prompt, "".join(parts))
+
+    @staticmethod
+    def in_flight_stats() -> Dict[str, int]:
+        """Upstream calls made versus requests served by another session's identical call."""
+        return _in_flight.stats()
+
+    def _flight_key(self, prompt: str) -> Tuple[str, str]:
+        """Key under which concurrent identical requests are coalesced."""
+        return self.model_name, normalize_prompt(prompt)
+
+    def _check_request(self, prompt: str, stream: bool = False,
+                       priority: int = 0) -> Tuple[Optional[str], Optional[Future]]:
+        """Apply rate limiting and question validation before calling the model.
         
         Args:
-            text: The question text to validate.
+            stream: Whether a speculative generation should be started in streaming mode.
+            priority: Position in the rate limit queue.
+            
         Returns:
-            True if the question is programming-related, False otherwise.
+            (rejection, generation): a message for the user if the request must
+            not be sent, and the speculative generation call if one was started.
         """
-        # Quick validation for common programming terms to avoid API calls
-        programming_keywords = [
-            "code", "program", "function", "class", "algorithm", 
-            "javascript", "python", "java", "c++", "html", "css",
-            "api", "framework", "library", "error", "bug", "debug",
-            "compiler", "interpreter", "syntax", "variable", "object",
-            "database", "sql", "http", "request", "response", "server",
-            "client", "git", "repository", "commit", "docker", "container",
-            "linux", "windows", "macos", "backend", "frontend", "fullstack"
-        ]
+        # Queue for a permit; only fail if the provider quota is exhausted for too long
+        with tracing.span("gemini.rate_limit", priority=priority) as span:
+            granted = self.rate_limiter.acquire(priority, timeout=RATE_LIMIT_MAX_WAIT_SECONDS)
+            span.set("granted", granted)
+        if not granted:
+            logger.warning(f"Rate limit queue timed out after {RATE_LIMIT_MAX_WAIT_SECONDS}s")
+            return RATE_LIMIT_MESSAGE, None
         
-        text_lower = text.lower()
-        for keyword in programming_keywords:
-            if keyword in text_lower:
-                logger.info(f"Keyword match found: {keyword}")
-                return True
+        # Validate the question, generating speculatively if the LLM has to be asked
+        with measure_time() as get_validation_time, tracing.span("gemini.validate") as span:
+            is_valid, probability = self._validate_locally(prompt)
+            generation = None
+            if is_valid is None:
+                generation = self._start_speculation(prompt, stream=stream)
+                is_valid = self._validate_with_llm(prompt, probability)
+                generation = self._settle_speculation(generation, is_valid)
+            span.update(valid=is_valid, speculative=generation is not None)
+        self._record_timing("validation", get_validation_time())
+        if not is_valid:
+            logger.info(f"Question validation failed: {prompt[:50]}...")
+            return REJECTION_MESSAGE, None
+        return None, generation
+
+    def _record_timing(self, stage: str, seconds: float) -> None:
+        if self.timing_stats is not None:
+            self.timing_stats.record(stage, seconds)
+
+    def _start_speculation(self, prompt: str, stream: bool = False) -> Optional[Future]:
+        """Submit the generation call ahead of LLM validation, if enabled and a worker is free."""
+        if not self.speculative:
+            return None
+        if not _speculation_slots.acquire(blocking=False):
+            logger.debug("All speculation workers busy, validating first")
+            return None
+        logger.info(f"Speculatively sending prompt to Gemini: {prompt[:50]}...")
+        try:
+            generation = _speculation_pool.submit(self.model.generate_content, prompt, stream=stream)
+        except BaseException:
+            _speculation_slots.release()
+            raise
+        generation.add_done_callback(lambda _: _speculation_slots.release())
+        return generation
+
+    def _settle_speculation(self, generation: Optional[Future], accepted: bool) -> Optional[Future]:
+        """Record the outcome of a speculative generation and cancel it if rejected.
+
+        Returns:
+            The generation to collect, or None if the caller should call the
+            model itself (rejected, or accepted before a worker picked it up)
+        """
+        if generation is None:
+            return None
+        with self._stats_lock:
+            self.speculation_stats["speculative"] += 1
+            if not accepted:
+                self.speculation_stats["rejected"] += 1
+                # Calls already in flight cannot be recalled, only discarded
+                if not generation.cancel():
+                    self.speculation_stats["wasted_generations"] += 1
+                return None
+        # Still queued: calling the model directly beats waiting for a worker
+        if generation.cancel():
+            return None
+        return generation
+
+    def _validate_locally(self, text: str) -> Tuple[Optional[bool], float]:
+        """Keyword matcher, local model and memoised verdicts; no network.
         
-        # For more ambiguous queries, use Gemini's validation
+        Returns:
+            (verdict, probability): verdict is None if the LLM has to decide;
+            probability is the local model's estimate.
+        """
+        verdict, probability = self.topic_classifier.classify(text)
+        tracing.current_span().update(source=verdict.source if verdict else "llm",
+                                      probability=round(probability, 3))
+        if verdict is None:
+            return None, probability
+        logger.info(f"Validation result for '{text[:30]}...': {verdict.is_programming} "
+                    f"({verdict.source}, confidence {verdict.confidence:.2f})")
+        return verdict.is_programming, probability
+
+    def _validate_with_llm(self, text: str, probability: float) -> bool:
+        """Ask the validation model about a question the local stages could not decide."""
+        with tracing.span("gemini.rate_limit", priority=VALIDATION_PRIORITY) as span:
+            granted = self.rate_limiter.acquire(VALIDATION_PRIORITY, timeout=RATE_LIMIT_MAX_WAIT_SECONDS)
+            span.set("granted", granted)
+        if not granted:
+            logger.warning("Rate limit queue timed out before validation, accepting the question")
+            return True
         try:
             validation_prompt = f"""Analyze if this question relates to computer Science/programming/software development (including languages, 
                                 frameworks, algorithms, debugging, or development concepts).
@@ -197,16 +522,19 @@ class GeminiModel:
                                 Respond ONLY with exactly 'TRUE' or 'FALSE' with no punctuation or explanations."""
             
             # Use validation model with strict configuration
-            response = self.validation_model.generate_content(
-                validation_prompt,
-                generation_config={
-                    "temperature": 0.0,
-                    "max_output_tokens": 5  # Slightly increased for reliability
-                }
-            )
+            with tracing.span("gemini.validation_call"):
+                response = self.validation_model.generate_content(
+                    validation_prompt,
+                    generation_config={
+                        "temperature": 0.0,
+                        "max_output_tokens": 5  # Slightly increased for reliability
+                    }
+                )
             
             result = "true" in response.text.lower().strip()
-            logger.info(f"Validation result for '{text[:30]}...': {result}")
+            logger.info(f"Validation result for '{text[:30]}...': {result} "
+                        f"(llm, local model estimate {probability:.2f})")
+            self.topic_classifier.remember(text, result)
             return result
             
         except Exception as e:
@@ -216,12 +544,37 @@ class GeminiModel:
     
     def _update_cache(self, prompt: str, response: str) -> None:
         """Update cache."""
-        self.cache[prompt] = response
+        self.cache.set(prompt, response)
+        if self.persistent_cache:
+            self.persistent_cache.set(prompt, response)
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(prompt, response)
         logger.debug(f"Added new entry to cache (size: {len(self.cache)})")
 
+    def clear_cache(self) -> None:
+        """Drop every in-memory cached answer, exact and semantic."""
+        self.cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
     def _get_from_cache(self, prompt: str) -> Optional[str]:
         """Get response from cache."""
-        if prompt in self.cache:
+        response = self.cache.get(prompt)
+        tier = "memory"
+        if response is None and self.persistent_cache:
+            # Another worker (or an earlier run) may already have answered this
+            entry = self.persistent_cache.get(prompt)
+            if entry:
+                response, remaining_ttl = entry
+                self.cache.set(prompt, response, ttl_seconds=remaining_ttl)
+                tier = "persistent"
+        if response is None and self.semantic_cache is not None:
+            match = self.semantic_cache.lookup(prompt)
+            if match:
+                response, similarity = match
+                tier = "semantic"
+                logger.info(f"Semantic cache hit (similarity {similarity:.3f})")
+        if response is not None:
             logger.info("Cache hit - returning cached response")
-            return self.cache[prompt]
-        return None
+        tracing.current_span().set("cache", tier if response is not None else "miss")
+        return response
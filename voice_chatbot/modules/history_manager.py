@@ -1,81 +1,127 @@
-import json
 from pathlib import Path
 from datetime import datetime
 import logging
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional
+from modules.history_store import JsonlHistoryStore, SqliteHistoryStore
+from modules.tts_cache import get_tts_cache
+from modules import tracing
 
 logger = logging.getLogger("HistoryManager")
 
 class HistoryManager:
-    def __init__(self, history_file: str = "conversation_history.json"):
+    def __init__(self, history_file: str = "conversation_history.json", backend: Optional[str] = None):
+        """
+        Args:
+            history_file: Name of the history file inside ``conversation_history``
+            backend: 'jsonl' (append-only JSON log) or 'sqlite'. Defaults to the
+                HISTORY_BACKEND environment variable, then 'jsonl'.
+        """
         self.history_dir = Path("conversation_history")
         self.history_dir.mkdir(exist_ok=True)
         self.history_file = self.history_dir / history_file
-        self.history = self._load_history()
+        # Where SpeechProcessor keeps recordings and synthesised answers
+        self.audio_dir = Path("audio_history")
+        self.backend = backend or os.getenv("HISTORY_BACKEND", "jsonl")
 
-    def _load_history(self) -> List[Dict[str, Any]]:
-        """Load existing conversation history from file"""
-        try:
-            if self.history_file.exists():
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
-        except Exception as e:
-            logger.error(f"Error loading history: {e}")
-            return []
+        log_file = self.history_file.with_suffix(".jsonl")
+        if self.backend == "jsonl":
+            # Turns are appended to a JSONL log; an existing JSON file is migrated on first open
+            self.store = JsonlHistoryStore(log_file, legacy_file=self.history_file)
+        elif self.backend == "sqlite":
+            # A new database imports the JSONL log, or the legacy JSON file if there is no log
+            self.store = SqliteHistoryStore(
+                self.history_file.with_suffix(".db"),
+                import_from=[log_file, self.history_file]
+            )
+        else:
+            raise ValueError(f"Unknown history backend: {self.backend}")
+
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        """Live conversations, oldest first"""
+        return self.store.all()
 
     def save_conversation(self, conversation: List[tuple]) -> None:
         """Save a new conversation to history"""
-        try:
-            # Format conversation for storage
-            formatted_conv = {
-                "timestamp": datetime.now().isoformat(),
-                "messages": [
-                    {
-                        "role": msg[0],
-                        "content": msg[1],
-                        "audio_file": msg[2]
-                    } for msg in conversation
-                ]
-            }
-            
-            # Load current history to ensure we have the latest
-            self.history = self._load_history()
-            
-            # Add new conversation
-            self.history.append(formatted_conv)
-            
-            # Save updated history to file
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False)
-                
-            logger.info("Conversation saved to history")
-        except Exception as e:
-            logger.error(f"Error saving conversation: {e}")
+        with tracing.span("history.save", backend=self.backend, messages=len(conversation)) as span:
+            try:
+                # Format conversation for storage
+                formatted_conv = {
+                    "timestamp": datetime.now().isoformat(),
+                    "messages": [
+                        {
+                            "role": msg[0],
+                            "content": msg[1],
+                            "audio_file": msg[2]
+                        } for msg in conversation
+                    ]
+                }
+
+                # Append a single record instead of rewriting the whole history
+                self.store.add(formatted_conv)
+
+                logger.info("Conversation saved to history")
+            except Exception as e:
+                logger.error(f"Error saving conversation: {e}")
+                span.set("error", str(e))
 
     def get_all_conversations(self) -> List[Dict[str, Any]]:
         """Retrieve all conversations"""
-        return self.history
+        return self.store.all()
 
     def get_recent_conversations(self, limit: int = 5) -> List[Dict[str, Any]]:
         """Retrieve recent conversations"""
-        return self.history[-limit:]
+        return self.store.recent(limit)
+
+    def get_conversations(self, offset: int = 0, limit: int = 10,
+                          include_messages: bool = True) -> List[Dict[str, Any]]:
+        """Retrieve one page of conversations, newest first.
+
+        Args:
+            offset: Number of newer conversations to skip
+            limit: Maximum number of conversations to return
+            include_messages: If False, only ``timestamp`` and ``message_count``
+                are returned for each conversation
+
+        Returns:
+            List of conversations, newest first
+        """
+        return self.store.page(offset, limit, include_messages)
+
+    def get_conversation(self, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Retrieve a single conversation with its messages"""
+        return self.store.get(timestamp)
+
+    def count_conversations(self) -> int:
+        """Number of stored conversations"""
+        return self.store.count()
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Search message contents across all conversations.
+
+        Returns:
+            Matching messages with their conversation ``timestamp``
+        """
+        if not query.strip():
+            return []
+        try:
+            return self.store.search(query, limit)
+        except Exception as e:
+            logger.error(f"Error searching history: {e}")
+            return []
 
     def delete_all_history(self) -> bool:
         """Delete all conversation history and associated audio files"""
         try:
-            # Clear the history list
-            self.history = []
-            
-            # Save empty history to file
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False)
+            # Clear the history log
+            self.store.clear()
             
-            # Delete all audio files
-            audio_dir = Path("audio_history")
-            if audio_dir.exists():
-                for audio_file in audio_dir.glob("*.*"):
+            # Delete all audio files, including the shared synthesised speech
+            if self.audio_dir.exists():
+                for audio_file in self.audio_dir.glob("*.*"):
                     audio_file.unlink()
+                self._tts_cache().clear()
             
             logger.info("All conversation history deleted successfully")
             return True
@@ -83,34 +129,28 @@ class HistoryManager:
             logger.error(f"Error deleting history: {e}")
             return False
 
+    def _tts_cache(self):
+        return get_tts_cache(self.audio_dir / "tts_cache")
+
     def delete_conversation(self, timestamp: str) -> bool:
         """Delete a specific conversation and its audio files"""
         try:
-            # Find the conversation
-            conv_to_delete = None
-            for conv in self.history:
-                if conv['timestamp'] == timestamp:
-                    conv_to_delete = conv
-                    break
-            
+            # Write a tombstone for the conversation
+            conv_to_delete = self.store.delete(timestamp)
+
             if not conv_to_delete:
                 return False
             
-            # Remove conversation from history
-            self.history.remove(conv_to_delete)
-            
-            # Delete associated audio files
+            # Delete associated audio files; cached speech may be shared with
+            # other conversations and is left to the cache's eviction
+            tts_cache = self._tts_cache()
             for message in conv_to_delete['messages']:
                 audio_file = message.get('audio_file')
-                if audio_file:
+                if audio_file and not tts_cache.contains_path(audio_file):
                     audio_path = Path(audio_file)
                     if audio_path.exists():
                         audio_path.unlink()
-            
-            # Save updated history
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2, ensure_ascii=False)
-            
+
             logger.info(f"Conversation from {timestamp} deleted successfully")
             return True
         except Exception as e:
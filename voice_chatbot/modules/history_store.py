@@ -0,0 +1,546 @@
+import itertools
+import json
+import sqlite3
+import os
+import threading
+import time
+import weakref
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only stores within one process are serialised
+    fcntl = None
+
+logger = logging.getLogger("HistoryStore")
+
+# Compaction policy: rewrite the log once dead records (overwritten adds,
+# deleted conversations and their tombstones) reach both thresholds
+COMPACTION_INTERVAL_SECONDS = 300
+COMPACTION_MIN_GARBAGE = 50
+COMPACTION_GARBAGE_RATIO = 1.0
+
+
+class _FileLock:
+    """Re-entrant lock on a log file, held across threads and processes.
+
+    Threads wait on an RLock; the outermost holder also takes an exclusive
+    ``flock`` on a sidecar ``.lock`` file, so Streamlit workers in other
+    processes never interleave an append with a compaction.
+    """
+
+    def __init__(self, path: Path):
+        self.lock_file = path.with_name(path.name + ".lock")
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+        return False
+
+    def _after_fork(self) -> None:
+        # A forked child shares the parent's open lock file, and with it the
+        # parent's flock; it needs its own to be excluded from the parent
+        self._lock = threading.RLock()
+        self._depth = 0
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# Every store opened on the same file in this process shares one lock, so
+# appends from different Streamlit sessions never interleave with a compaction
+_file_locks: Dict[str, _FileLock] = {}
+_file_locks_guard = threading.Lock()
+
+
+def _lock_for(path: Path) -> _FileLock:
+    key = os.path.abspath(path)
+    with _file_locks_guard:
+        if key not in _file_locks:
+            _file_locks[key] = _FileLock(Path(key))
+        return _file_locks[key]
+
+
+def _reset_locks_after_fork() -> None:
+    global _file_locks_guard
+    _file_locks_guard = threading.Lock()
+    for lock in _file_locks.values():
+        lock._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+class _Compactor:
+    """Single daemon thread that periodically compacts every open store"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stores = weakref.WeakSet()
+        self._guard = threading.Lock()
+        self._thread = None
+
+    def register(self, store: "JsonlHistoryStore") -> None:
+        with self._guard:
+            self.stores.add(store)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="history-compactor", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            for store in list(self.stores):
+                try:
+                    if store.needs_compaction():
+                        store.compact()
+                except Exception as e:
+                    logger.error(f"Background compaction failed: {e}")
+
+
+_compactor = _Compactor(COMPACTION_INTERVAL_SECONDS)
+
+
+class JsonlHistoryStore:
+    """Append-only conversation log, one JSON record per line.
+
+    Records are ``{"op": "add", "conversation": {...}}``,
+    ``{"op": "delete", "timestamp": ...}`` (a tombstone) and ``{"op": "clear"}``.
+    Saving a turn appends a single line regardless of history size; the live
+    state is kept in memory and the log is rewritten in the background once
+    enough dead records have piled up. Reads, appends and compactions hold
+    an OS file lock, so several processes can share one log (on platforms
+    without ``fcntl`` only the stores within one process are serialised).
+    """
+
+    def __init__(self, log_file: Path, legacy_file: Optional[Path] = None,
+                 background_compaction: bool = True):
+        """
+        Args:
+            log_file: Path of the JSONL log
+            legacy_file: Old single-document JSON history to import on first open
+            background_compaction: Register with the shared compaction thread
+        """
+        self.log_file = Path(log_file)
+        self._lock = _lock_for(self.log_file)
+        self._conversations: Dict[str, Dict[str, Any]] = {}
+        self._offset = 0
+        self._inode = None
+        self._garbage = 0
+
+        with self._lock:
+            if legacy_file is not None and not self.log_file.exists() and Path(legacy_file).exists():
+                self._migrate(Path(legacy_file))
+            self._refresh()
+
+        if background_compaction:
+            _compactor.register(self)
+
+    def _migrate(self, legacy_file: Path) -> None:
+        """Import a legacy JSON history file into a fresh log"""
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                conversations = json.load(f)
+            self._write_snapshot(conversations)
+            legacy_file.replace(legacy_file.with_name(legacy_file.name + ".bak"))
+            logger.info(f"Migrated {len(conversations)} conversations from {legacy_file}")
+        except Exception as e:
+            logger.error(f"Error migrating legacy history: {e}")
+
+    def _write_snapshot(self, conversations) -> None:
+        """Atomically replace the log with one add record per conversation"""
+        tmp_file = self.log_file.with_name(self.log_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for conv in conversations:
+                f.write(json.dumps({"op": "add", "conversation": conv}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.log_file)
+
+    def _reset_state(self) -> None:
+        self._conversations = {}
+        self._offset = 0
+        self._inode = None
+        self._garbage = 0
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record.get("op")
+        if op == "add":
+            conv = record["conversation"]
+            if conv["timestamp"] in self._conversations:
+                self._garbage += 1
+            self._conversations[conv["timestamp"]] = conv
+        elif op == "delete":
+            removed = self._conversations.pop(record["timestamp"], None)
+            self._garbage += 2 if removed is not None else 1
+        elif op == "clear":
+            self._garbage += len(self._conversations) + 1
+            self._conversations = {}
+
+    def _refresh(self) -> None:
+        """Apply records appended since the last read, possibly by another store.
+
+        A compaction replaces the file, so a new inode or a shrunken file means
+        the in-memory state has to be rebuilt from scratch.
+        """
+        try:
+            stat = self.log_file.stat()
+        except FileNotFoundError:
+            self._reset_state()
+            return
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset_state()
+            self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.log_file, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+
+        # Leave a partially written trailing line for the next refresh
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping corrupt history record: {e}")
+                self._garbage += 1
+        self._offset += end
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock:
+            self._refresh()
+            with open(self.log_file, 'ab') as f:
+                f.write(line)
+                f.flush()
+                if self._inode is None:
+                    self._inode = os.fstat(f.fileno()).st_ino
+            self._offset += len(line)
+            self._apply(record)
+
+    def add(self, conversation: Dict[str, Any]) -> None:
+        """Append a conversation to the log"""
+        self._append({"op": "add", "conversation": conversation})
+
+    def all(self) -> List[Dict[str, Any]]:
+        """All live conversations, oldest first"""
+        with self._lock:
+            self._refresh()
+            return list(self._conversations.values())
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """The ``limit`` most recent conversations, oldest first"""
+        return self.all()[-limit:] if limit > 0 else []
+
+    def page(self, offset: int, limit: int, include_messages: bool = True) -> List[Dict[str, Any]]:
+        """A page of conversations, newest first"""
+        with self._lock:
+            self._refresh()
+            convs = itertools.islice(reversed(self._conversations.values()), offset, offset + limit)
+            if include_messages:
+                return list(convs)
+            return [
+                {"timestamp": conv["timestamp"], "message_count": len(conv["messages"])}
+                for conv in convs
+            ]
+
+    def count(self) -> int:
+        """Number of live conversations"""
+        with self._lock:
+            self._refresh()
+            return len(self._conversations)
+
+    def get(self, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Look up a conversation by its timestamp"""
+        with self._lock:
+            self._refresh()
+            return self._conversations.get(timestamp)
+
+    def delete(self, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Write a tombstone for a conversation and return the removed entry"""
+        with self._lock:
+            self._refresh()
+            conv = self._conversations.get(timestamp)
+            if conv is None:
+                return None
+            self._append({"op": "delete", "timestamp": timestamp})
+            return conv
+
+    def clear(self) -> None:
+        """Drop every conversation"""
+        self._append({"op": "clear"})
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Case-insensitive substring search over message contents, newest first"""
+        needle = query.lower()
+        results = []
+        for conv in reversed(self.all()):
+            for msg in conv["messages"]:
+                if needle in (msg.get("content") or "").lower():
+                    results.append({"timestamp": conv["timestamp"], **msg})
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def needs_compaction(self) -> bool:
+        with self._lock:
+            self._refresh()
+            return (self._garbage >= COMPACTION_MIN_GARBAGE and
+                    self._garbage >= COMPACTION_GARBAGE_RATIO * len(self._conversations))
+
+    def compact(self) -> None:
+        """Rewrite the log so it only holds live conversations"""
+        with self._lock:
+            self._refresh()
+            self._write_snapshot(self._conversations.values())
+            stat = self.log_file.stat()
+            self._inode = stat.st_ino
+            self._offset = stat.st_size
+            self._garbage = 0
+        logger.info(f"Compacted history log ({len(self._conversations)} conversations)")
+
+
+def _escape_like(text: str) -> str:
+    """Escape LIKE wildcards so they match literally (with ESCAPE '\\')"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SqliteHistoryStore:
+    """Conversation history in SQLite with an FTS5 index over message contents.
+
+    Conversations are looked up and deleted through an index on ``timestamp``
+    and searched without loading the history into memory. When the SQLite
+    build lacks FTS5, search falls back to a ``LIKE`` scan.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp);
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER NOT NULL REFERENCES conversations(id),
+            position INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT,
+            audio_file TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id, position);
+    """
+
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            content, content='messages', content_rowid='id'
+        );
+        CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END;
+    """
+
+    def __init__(self, db_file: Path, import_from: Optional[List[Path]] = None):
+        """
+        Args:
+            db_file: Path of the SQLite database
+            import_from: History files (JSONL log or legacy JSON) to import
+                into a newly created database; the first existing one is used
+        """
+        self.db_file = Path(db_file)
+        self._lock = threading.RLock()
+        is_new = not self.db_file.exists()
+
+        # Streamlit serves sessions from several threads; access goes through self._lock
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        try:
+            self._conn.executescript(self.FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, falling back to LIKE search: {e}")
+            self.has_fts = False
+        self._conn.commit()
+
+        if is_new:
+            for path in import_from or []:
+                if Path(path).exists():
+                    self._import(Path(path))
+                    break
+
+    def _import(self, path: Path) -> None:
+        """Copy conversations from a JSONL log or legacy JSON file"""
+        try:
+            if path.suffix == ".jsonl":
+                conversations = JsonlHistoryStore(path, background_compaction=False).all()
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    conversations = json.load(f)
+            with self._lock, self._conn:
+                for conv in conversations:
+                    self._insert(conv)
+            logger.info(f"Imported {len(conversations)} conversations from {path}")
+        except Exception as e:
+            logger.error(f"Error importing history from {path}: {e}")
+
+    def _insert(self, conversation: Dict[str, Any]) -> None:
+        cur = self._conn.execute(
+            "INSERT INTO conversations (timestamp) VALUES (?)", (conversation["timestamp"],)
+        )
+        self._conn.executemany(
+            "INSERT INTO messages (conversation_id, position, role, content, audio_file) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (cur.lastrowid, i, msg["role"], msg.get("content"), msg.get("audio_file"))
+                for i, msg in enumerate(conversation["messages"])
+            ]
+        )
+
+    def _load(self, rows) -> List[Dict[str, Any]]:
+        """Build conversation dicts for the given conversation rows"""
+        conversations = {row["id"]: {"timestamp": row["timestamp"], "messages": []} for row in rows}
+        if not conversations:
+            return []
+        ids = list(conversations)
+        placeholders = ",".join("?" * len(ids))
+        for msg in self._conn.execute(
+            f"SELECT conversation_id, role, content, audio_file FROM messages "
+            f"WHERE conversation_id IN ({placeholders}) ORDER BY conversation_id, position",
+            ids
+        ):
+            conversations[msg["conversation_id"]]["messages"].append({
+                "role": msg["role"],
+                "content": msg["content"],
+                "audio_file": msg["audio_file"]
+            })
+        return list(conversations.values())
+
+    def add(self, conversation: Dict[str, Any]) -> None:
+        """Insert a conversation and its messages"""
+        with self._lock, self._conn:
+            self._insert(conversation)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """All conversations, oldest first"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, timestamp FROM conversations ORDER BY id").fetchall()
+            return self._load(rows)
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """The ``limit`` most recent conversations, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, timestamp FROM conversations ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return self._load(reversed(rows))
+
+    def page(self, offset: int, limit: int, include_messages: bool = True) -> List[Dict[str, Any]]:
+        """A page of conversations, newest first"""
+        with self._lock:
+            if include_messages:
+                rows = self._conn.execute(
+                    "SELECT id, timestamp FROM conversations ORDER BY id DESC LIMIT ? OFFSET ?",
+                    (limit, offset)
+                ).fetchall()
+                return self._load(rows)
+            rows = self._conn.execute(
+                "SELECT c.timestamp, "
+                "(SELECT COUNT(*) FROM messages m WHERE m.conversation_id = c.id) AS message_count "
+                "FROM conversations c ORDER BY c.id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+            return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        """Number of stored conversations"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def get(self, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Look up a conversation by its timestamp"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, timestamp FROM conversations WHERE timestamp = ? LIMIT 1", (timestamp,)
+            ).fetchall()
+            loaded = self._load(rows)
+            return loaded[0] if loaded else None
+
+    def delete(self, timestamp: str) -> Optional[Dict[str, Any]]:
+        """Delete a conversation and return the removed entry"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, timestamp FROM conversations WHERE timestamp = ? LIMIT 1", (timestamp,)
+            ).fetchone()
+            if row is None:
+                return None
+            conv = self._load([row])[0]
+            with self._conn:
+                self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (row["id"],))
+                self._conn.execute("DELETE FROM conversations WHERE id = ?", (row["id"],))
+            return conv
+
+    def clear(self) -> None:
+        """Drop every conversation"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages")
+            self._conn.execute("DELETE FROM conversations")
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Full-text search over message contents, best matches first"""
+        with self._lock:
+            if self.has_fts:
+                # Quote every term so user input is never parsed as FTS5 syntax, and
+                # match it as a prefix so partial words find what the JSONL backend finds
+                terms = " ".join('"' + term.replace('"', '""') + '"*' for term in query.split())
+                rows = self._conn.execute(
+                    "SELECT c.timestamp, m.role, m.content, m.audio_file "
+                    "FROM messages_fts f "
+                    "JOIN messages m ON m.id = f.rowid "
+                    "JOIN conversations c ON c.id = m.conversation_id "
+                    "WHERE messages_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                    (terms, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT c.timestamp, m.role, m.content, m.audio_file "
+                    "FROM messages m JOIN conversations c ON c.id = m.conversation_id "
+                    "WHERE m.content LIKE ? ESCAPE '\\' ORDER BY m.id DESC LIMIT ?",
+                    (f"%{_escape_like(query)}%", limit)
+                ).fetchall()
+            return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,120 @@
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("ModelRegistry")
+
+
+class SharedWhisperModel:
+    """A Whisper model shared by every SpeechProcessor in the process.
+
+    Whisper models are not safe to run concurrently, so inference is
+    serialized through a per-model lock.
+    """
+
+    def __init__(self, key: Tuple[str, Optional[str], bool], model):
+        self.key = key
+        self.model = model
+        self.refcount = 0
+        self.warmed_up = False
+        self._inference_lock = threading.Lock()
+
+    @property
+    def fp16(self) -> bool:
+        return self.key[2]
+
+    def warm_up(self, language: Optional[str] = None) -> None:
+        """Run one dummy inference so the first real request skips lazy initialisation"""
+        if self.warmed_up:
+            return
+        import numpy as np
+        # One second of silence at Whisper's 16 kHz sample rate
+        self.transcribe(np.zeros(16000, dtype=np.float32), language=language)
+        self.warmed_up = True
+
+    def transcribe(self, audio, **kwargs):
+        """Run ``model.transcribe`` while holding the inference lock"""
+        kwargs.setdefault("fp16", self.fp16)
+        with self._inference_lock:
+            return self.model.transcribe(audio, **kwargs)
+
+
+class WhisperModelRegistry:
+    """Process-wide, reference-counted cache of loaded Whisper models.
+
+    Models are keyed by (model size, device, fp16). The first acquire of a key
+    loads the model; later acquires, from any session, reuse it. Loading
+    happens outside the registry lock so one slow load does not block
+    sessions using other models.
+    """
+
+    def __init__(self, keep_idle: bool = True):
+        """
+        Args:
+            keep_idle: Keep a model loaded after its last reference is released,
+                so the next session does not pay the load again
+        """
+        self.keep_idle = keep_idle
+        self._models: Dict[Tuple, SharedWhisperModel] = {}
+        self._loading: Dict[Tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, model_size: str = "base", device: Optional[str] = None,
+                fp16: bool = False) -> SharedWhisperModel:
+        """Get a shared model, loading it on first use"""
+        key = (model_size, device, fp16)
+        while True:
+            with self._lock:
+                shared = self._models.get(key)
+                if shared is not None:
+                    shared.refcount += 1
+                    return shared
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Another thread is loading this model; wait and look again
+            loading.wait()
+
+        try:
+            logger.info(f"Loading Whisper model: {model_size} (device={device}, fp16={fp16})")
+            # Imported here so processes that never transcribe skip torch entirely
+            import whisper
+            model = whisper.load_model(model_size, device=device)
+            with self._lock:
+                shared = self._models[key] = SharedWhisperModel(key, model)
+                shared.refcount += 1
+            return shared
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def release(self, shared: SharedWhisperModel) -> None:
+        """Drop a reference obtained from ``acquire``"""
+        with self._lock:
+            shared.refcount -= 1
+            if shared.refcount <= 0 and not self.keep_idle:
+                if self._models.get(shared.key) is shared:
+                    del self._models[shared.key]
+                    logger.info(f"Unloaded Whisper model: {shared.key[0]}")
+
+    def evict_idle(self) -> int:
+        """Unload every model nobody holds a reference to"""
+        with self._lock:
+            idle = [key for key, shared in self._models.items() if shared.refcount <= 0]
+            for key in idle:
+                del self._models[key]
+        return len(idle)
+
+    def stats(self) -> Dict[str, int]:
+        """Reference count per loaded model"""
+        with self._lock:
+            return {
+                f"{size}/{device or 'auto'}/{'fp16' if fp16 else 'fp32'}": shared.refcount
+                for (size, device, fp16), shared in self._models.items()
+            }
+
+
+# Shared by every Streamlit session served by this process
+whisper_registry = WhisperModelRegistry()
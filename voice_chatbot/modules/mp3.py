@@ -0,0 +1,87 @@
+from typing import Iterator, List, Tuple
+
+# Bitrates in kbps, indexed by (is MPEG-1, layer) and the header's bitrate index
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates indexed by the header's version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def frame_length(header: bytes) -> int:
+    """Length in bytes of the frame starting with ``header``, or 0 if it is not a frame header"""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return 0
+    version = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = (header[2] >> 4) & 0x0F
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return 0
+
+    layer = 4 - layer_bits
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def _id3v2_size(data: bytes) -> int:
+    """Size of a leading ID3v2 tag, including its header and optional footer"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    has_footer = data[5] & 0x10
+    return 10 + size + (10 if has_footer else 0)
+
+
+def iter_frames(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Yield (offset, length) of each audio frame, skipping tags and junk"""
+    pos = _id3v2_size(data)
+    end = len(data)
+    if end - pos >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128  # ID3v1 tag
+
+    while pos + 4 <= end:
+        length = frame_length(data[pos:pos + 4])
+        if length and pos + length <= end:
+            yield pos, length
+            pos += length
+        else:
+            pos += 1  # Resynchronise on the next frame header
+
+
+def _is_info_frame(frame: bytes) -> bool:
+    """Xing/Info/VBRI frames describe the whole file and must not be repeated mid-stream"""
+    head = frame[:64]
+    return b"Xing" in head or b"Info" in head or b"VBRI" in head
+
+
+def concat_mp3(parts: List[bytes]) -> bytes:
+    """Join MP3 files at frame level.
+
+    Tags and per-file Xing/Info header frames are dropped so players see
+    one continuous stream instead of stopping after the first part.
+    """
+    out = []
+    for data in parts:
+        first = True
+        for offset, length in iter_frames(data):
+            frame = data[offset:offset + length]
+            if first and _is_info_frame(frame):
+                first = False
+                continue
+            first = False
+            out.append(frame)
+    return b"".join(out)
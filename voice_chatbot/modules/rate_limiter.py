@@ -0,0 +1,174 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("RateLimiter")
+
+
+class _Waiter:
+    __slots__ = ("key", "cancelled")
+
+    def __init__(self, key):
+        self.key = key
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+class TokenBucketLimiter:
+    """Thread-safe token bucket that queues callers instead of rejecting them.
+
+    Tokens refill continuously at ``rate`` per second up to ``burst``. Callers
+    wait in a queue ordered by priority (higher first) and then by arrival,
+    and only the head of the queue may take a token, so requests are served
+    in order. A caller that is not served before its deadline gives up its
+    place. Sync callers block on a condition variable; async callers sleep
+    on the event loop until the next token is due.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Sustained number of permits per second
+            burst: Maximum number of permits available at once
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition(threading.Lock())
+
+        self.granted = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_queue = 0
+
+    def acquire(self, priority: int = 0, timeout: Optional[float] = None) -> bool:
+        """Block until a permit is available
+
+        Args:
+            priority: Callers with a higher priority are served first
+            timeout: Maximum time to wait in seconds; None waits indefinitely
+
+        Returns:
+            True if a permit was granted, False if the deadline passed first
+        """
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        with self._cond:
+            waiter = self._enqueue(priority)
+            while True:
+                delay = self._poll(waiter, start)
+                if delay == 0.0:
+                    return True
+                remaining = self._remaining(waiter, deadline)
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(delay if remaining is None else min(delay, remaining))
+
+    async def acquire_async(self, priority: int = 0, timeout: Optional[float] = None) -> bool:
+        """Asynchronous version of acquire that does not block the event loop"""
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        with self._cond:
+            waiter = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._poll(waiter, start)
+                    if delay == 0.0:
+                        return True
+                    remaining = self._remaining(waiter, deadline)
+                    if remaining is not None and remaining <= 0:
+                        return False
+                await asyncio.sleep(delay if remaining is None else min(delay, remaining))
+        except asyncio.CancelledError:
+            with self._cond:
+                self._cancel(waiter)
+            raise
+
+    def _enqueue(self, priority: int) -> _Waiter:
+        waiter = _Waiter((-priority, next(self._sequence)))
+        heapq.heappush(self._queue, waiter)
+        self.max_queue = max(self.max_queue, len(self._queue))
+        return waiter
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _poll(self, waiter: _Waiter, start: float) -> float:
+        """Grant a permit if ``waiter`` is at the head and a token is available
+
+        Returns:
+            0.0 if granted, otherwise how long to wait before polling again
+        """
+        self._refill()
+        while self._queue and self._queue[0].cancelled:
+            heapq.heappop(self._queue)
+        if self._queue[0] is waiter and self._tokens >= 1.0:
+            heapq.heappop(self._queue)
+            self._tokens -= 1.0
+            self.granted += 1
+            self.total_wait += time.monotonic() - start
+            # The next waiter may be able to go immediately (burst)
+            self._cond.notify_all()
+            return 0.0
+        if self._tokens < 1.0:
+            return (1.0 - self._tokens) / self.rate
+        # A token is free but another waiter is ahead; it is being woken
+        return 0.005
+
+    def _remaining(self, waiter: _Waiter, deadline: Optional[float]) -> Optional[float]:
+        """Time left before ``deadline``; cancels the waiter once it has passed"""
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._cancel(waiter)
+            self.timed_out += 1
+        return remaining
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        waiter.cancelled = True
+        # Whoever is behind may now be at the head
+        self._cond.notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        """Permits granted, timeouts, average wait and queue lengths"""
+        with self._cond:
+            self._refill()
+            return {
+                "granted": self.granted,
+                "timed_out": self.timed_out,
+                "average_wait": self.total_wait / self.granted if self.granted else 0.0,
+                "queued": sum(1 for w in self._queue if not w.cancelled),
+                "max_queue": self.max_queue,
+                "tokens": self._tokens,
+            }
+
+
+# One limiter per name, shared by every session in the process
+_limiters: Dict[str, TokenBucketLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, burst: int = 1) -> TokenBucketLimiter:
+    """Return the process-wide limiter called ``name``, creating it on first use
+
+    ``rate`` and ``burst`` only apply when the limiter is created.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = TokenBucketLimiter(rate, burst)
+        return _limiters[name]
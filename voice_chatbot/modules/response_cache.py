@@ -0,0 +1,218 @@
+import re
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("ResponseCache")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!,;:]+$")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical cache key for a prompt.
+
+    Case, runs of whitespace and trailing punctuation do not change the
+    question, so "What is a closure?" and "what is a  closure " share a key.
+    """
+    text = _WHITESPACE.sub(" ", prompt).strip().lower()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+class ResponseCache:
+    """Thread-safe in-memory LRU cache of model responses.
+
+    Bounded by entry count and by the approximate size of keys and values,
+    with a per-entry time to live. Keys are normalised with
+    ``normalize_prompt``.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 10 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = 24 * 3600):
+        """
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached prompts and responses
+            ttl_seconds: Lifetime of an entry; None keeps entries until evicted
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # key -> (response, expiry on the monotonic clock, size in bytes)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float], int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str) -> Optional[str]:
+        """Cached response for ``prompt``, or None"""
+        key = normalize_prompt(prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            response, expires_at, size = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._total_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def set(self, prompt: str, response: str, ttl_seconds: Optional[float] = None) -> None:
+        """Store a response, evicting least recently used entries if needed
+
+        Args:
+            ttl_seconds: Overrides the cache's default lifetime for this entry
+        """
+        key = normalize_prompt(prompt)
+        size = len(key.encode('utf-8')) + len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[2]
+            self._entries[key] = (response, expires_at, size)
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+
+class SqliteResponseCache:
+    """Persistent response cache shared by every process on the machine.
+
+    Entries live in a SQLite database in WAL mode, so several Streamlit
+    workers can read concurrently while one writes, and cached answers
+    survive restarts. Expiry uses wall-clock time so it is consistent
+    across processes; expired rows are purged periodically on write.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(self, db_file: str, ttl_seconds: Optional[float] = 7 * 24 * 3600):
+        """
+        Args:
+            db_file: Path of the SQLite database (created if missing)
+            ttl_seconds: Lifetime of an entry; None keeps entries forever
+        """
+        self.db_file = db_file
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at)")
+        self._conn.commit()
+
+    def get(self, prompt: str) -> Optional[Tuple[str, Optional[float]]]:
+        """Cached response and its remaining lifetime in seconds, or None"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, expires_at FROM responses "
+                    "WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (normalize_prompt(prompt), now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Persistent cache read failed: {e}")
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        response, expires_at = row
+        return response, (expires_at - now if expires_at is not None else None)
+
+    def set(self, prompt: str, response: str) -> None:
+        """Store a response, replacing any previous entry for the prompt"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (normalize_prompt(prompt), response, now, expires_at)
+                )
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            logger.error(f"Persistent cache write failed: {e}")
+
+    def warm(self, cache: ResponseCache, limit: int = 500) -> int:
+        """Copy the most recent unexpired entries into an in-memory cache
+
+        Returns:
+            Number of entries loaded
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, response, expires_at FROM responses "
+                    "WHERE expires_at IS NULL OR expires_at > ? "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (now, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Persistent cache warm-up failed: {e}")
+            return 0
+        # Oldest first, so the newest entries end up most recently used
+        for key, response, expires_at in reversed(rows):
+            cache.set(key, response, ttl_seconds=expires_at - now if expires_at is not None else None)
+        return len(rows)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,244 @@
+import zlib
+import math
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from modules.response_cache import normalize_prompt
+
+
+class HashingVectorizer:
+    """Offline text vectoriser using hashed word and character n-gram counts.
+
+    Features are hashed into a fixed number of buckets with CRC32 (stable
+    across processes, unlike ``hash``), so no vocabulary has to be stored.
+    Counts are dampened with ``1 + log(tf)``.
+    """
+
+    def __init__(self, n_features: int = 512, char_ngrams: Tuple[int, int] = (3, 4)):
+        self.n_features = n_features
+        self.char_ngrams = char_ngrams
+
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse representation: bucket indices and dampened counts"""
+        text = normalize_prompt(text)
+        tokens = ["w:" + word for word in text.split()]
+        padded = f" {text} "
+        low, high = self.char_ngrams
+        for n in range(low, high + 1):
+            tokens.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+        counts: Dict[int, int] = {}
+        for token in tokens:
+            bucket = zlib.crc32(token.encode('utf-8')) % self.n_features
+            counts[bucket] = counts.get(bucket, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = np.fromiter((1.0 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+        return indices, values
+
+    def transform(self, text: str, weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse L2-normalised vector, optionally reweighted per bucket (e.g. IDF)"""
+        indices, values = self.features(text)
+        if weights is not None:
+            values = values * weights[indices]
+        norm = np.linalg.norm(values)
+        return indices, (values / norm if norm else values)
+
+
+class SemanticCache:
+    """Approximate response cache matching paraphrased prompts.
+
+    Every cached prompt is stored as a TF-IDF weighted, normalised column of a
+    preallocated feature-major matrix. A lookup only reads the rows for the
+    buckets present in the query (a few dozen of them), so its cost is a
+    small dense product over all entries followed by an argmax. The IDF
+    weights are frozen when a column is written and all columns are
+    re-weighted whenever the number of entries has doubled.
+
+    Like ``ResponseCache`` it is bounded by entry count and bytes (prompt,
+    response and the entry's matrix column) and entries expire after a
+    time to live. When full, the oldest entries are evicted; their columns
+    are zeroed and the slots reused.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 1000,
+                 max_bytes: int = 10 * 1024 * 1024, ttl_seconds: Optional[float] = 24 * 3600,
+                 vectorizer: Optional[HashingVectorizer] = None):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a cached answer to be returned
+            max_entries: Capacity of the index
+            max_bytes: Maximum total size of cached prompts, responses and their columns
+            ttl_seconds: Lifetime of an entry; None keeps entries until evicted
+            vectorizer: Feature extractor (defaults to a 512-bucket HashingVectorizer)
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self._column_bytes = self.vectorizer.n_features * np.dtype(np.float32).itemsize
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.last_similarity: Optional[float] = None
+        self.last_match: Optional[str] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        n_features = self.vectorizer.n_features
+        # One column per slot; empty slots are all zeros and never match
+        self._matrix = np.zeros((n_features, min(1024, self.max_entries)), dtype=np.float32)
+        self._features: List[Optional[Tuple[np.ndarray, np.ndarray]]] = []
+        self._responses: List[Optional[str]] = []
+        self._prompts: List[Optional[str]] = []
+        # Expiry on the monotonic clock and size in bytes, per slot
+        self._expires: List[Optional[float]] = []
+        self._sizes: List[int] = []
+        # Live slots, oldest first, and slots freed by eviction or expiry
+        self._order: "OrderedDict[int, None]" = OrderedDict()
+        self._free: List[int] = []
+        self._total_bytes = 0
+        self._doc_freq = np.zeros(n_features, dtype=np.float32)
+        self._idf = np.ones(n_features, dtype=np.float32)
+        self._reweighted_at = 1
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def _update_idf(self) -> None:
+        n = len(self._order)
+        self._idf = (np.log((1.0 + n) / (1.0 + self._doc_freq)) + 1.0).astype(np.float32)
+
+    def _column(self, features: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        indices, values = features
+        row = np.zeros(self.vectorizer.n_features, dtype=np.float32)
+        row[indices] = values * self._idf[indices]
+        norm = np.linalg.norm(row)
+        return row / norm if norm else row
+
+    def _reweight(self) -> None:
+        """Recompute IDF and rewrite every live column with it"""
+        self._update_idf()
+        for slot in self._order:
+            self._matrix[:, slot] = self._column(self._features[slot])
+        self._reweighted_at = max(1, len(self._order))
+
+    def _remove(self, slot: int) -> None:
+        """Drop the entry in ``slot`` and free the slot; caller holds the lock"""
+        del self._order[slot]
+        self._doc_freq[self._features[slot][0]] -= 1
+        self._matrix[:, slot] = 0.0
+        self._total_bytes -= self._sizes[slot]
+        self._features[slot] = self._responses[slot] = self._prompts[slot] = None
+        self._expires[slot] = None
+        self._sizes[slot] = 0
+        self._free.append(slot)
+
+    def _allocate(self) -> int:
+        """A free slot, growing the matrix or evicting the oldest entry if needed"""
+        if self._free:
+            return self._free.pop()
+        slot = len(self._responses)
+        if slot >= self.max_entries:
+            self._remove(next(iter(self._order)))
+            self.evictions += 1
+            return self._free.pop()
+        capacity = self._matrix.shape[1]
+        if slot >= capacity:
+            grown = np.zeros((self._matrix.shape[0], min(capacity * 2, self.max_entries)),
+                             dtype=np.float32)
+            grown[:, :capacity] = self._matrix
+            self._matrix = grown
+        self._features.append(None)
+        self._responses.append(None)
+        self._prompts.append(None)
+        self._expires.append(None)
+        self._sizes.append(0)
+        return slot
+
+    def add(self, prompt: str, response: str, ttl_seconds: Optional[float] = None) -> None:
+        """Index a prompt and its response
+
+        Args:
+            ttl_seconds: Overrides the cache's default lifetime for this entry
+        """
+        size = len(prompt.encode('utf-8')) + len(response.encode('utf-8')) + self._column_bytes
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        features = self.vectorizer.features(prompt)
+
+        with self._lock:
+            slot = self._allocate()
+            self._features[slot] = features
+            self._responses[slot] = response
+            self._prompts[slot] = prompt
+            self._expires[slot] = expires_at
+            self._sizes[slot] = size
+            self._order[slot] = None
+            self._total_bytes += size
+            self._doc_freq[features[0]] += 1
+
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._order)))
+                self.evictions += 1
+
+            if len(self._order) >= 2 * self._reweighted_at:
+                self._reweight()
+            elif slot in self._order:
+                self._matrix[:, slot] = self._column(features)
+
+    def lookup(self, prompt: str) -> Optional[Tuple[str, float]]:
+        """Best unexpired cached response and its similarity, if above the threshold"""
+        with self._lock:
+            if not self._order:
+                self.misses += 1
+                self.last_similarity = None
+                return None
+            indices, values = self.vectorizer.transform(prompt, self._idf)
+            scores = values @ self._matrix[indices, :len(self._responses)]
+            now = time.monotonic()
+            while True:
+                best = int(np.argmax(scores))
+                similarity = float(scores[best])
+                expires_at = self._expires[best]
+                if best not in self._order or expires_at is None or now < expires_at:
+                    break
+                # Expired: drop it and look at the next best entry
+                self._remove(best)
+                self.expirations += 1
+                scores[best] = -1.0
+            self.last_similarity = similarity
+            self.last_match = self._prompts[best]
+            if similarity >= self.threshold and best in self._order:
+                self.hits += 1
+                return self._responses[best], similarity
+            self.misses += 1
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate, threshold, usage and the closest prompt seen by the last lookup"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+                "last_similarity": self.last_similarity,
+                "last_match": self.last_match,
+                "entries": len(self._order),
+                "bytes": self._total_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
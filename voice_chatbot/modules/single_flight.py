@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger("SingleFlight")
+
+
+class LeaderAbandoned(Exception):
+    """The call being waited on was given up before it produced a result"""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one.
+
+    The first caller for a key becomes the leader and does the work; callers
+    arriving while it is in flight wait on the leader's Future and receive
+    the same result (or exception). Sync waiters block on the Future, async
+    waiters await a shielded ``asyncio.wrap_future`` of it, so cancelling one
+    waiter never cancels the shared Future. If the leader abandons
+    the call (e.g. an async leader is cancelled), the waiters retry and one
+    of them becomes the new leader.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def join(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return the in-flight Future for ``key`` and whether the caller must lead"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def finish(self, key: Hashable, future: Future, result: Any) -> None:
+        """Publish the leader's result to every waiter"""
+        self._release(key, future)
+        try:
+            future.set_result(result)
+        except InvalidStateError:
+            pass  # Already settled; nothing is left to publish
+
+    def fail(self, key: Hashable, future: Future, error: BaseException) -> None:
+        """Publish the leader's exception to every waiter"""
+        self._release(key, future)
+        try:
+            future.set_exception(error)
+        except InvalidStateError:
+            pass
+
+    def abandon(self, key: Hashable, future: Future) -> None:
+        """Give up leading; waiters retry instead of receiving a result"""
+        self.fail(key, future, LeaderAbandoned())
+
+    def _release(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` unless an identical call is in flight, and return its result"""
+        while True:
+            future, leader = self.join(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self.fail(key, future, e)
+                    raise
+                self.finish(key, future, result)
+                return result
+            try:
+                return future.result()
+            except LeaderAbandoned:
+                continue
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Asynchronous version of do; ``fn`` returns the awaitable to run when leading"""
+        while True:
+            future, leader = self.join(key)
+            if leader:
+                try:
+                    result = await fn()
+                except asyncio.CancelledError:
+                    self.abandon(key, future)
+                    raise
+                except BaseException as e:
+                    self.fail(key, future, e)
+                    raise
+                self.finish(key, future, result)
+                return result
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except LeaderAbandoned:
+                continue
+
+    def stats(self) -> Dict[str, int]:
+        """Calls made by leaders, calls served from another caller's flight and calls in flight"""
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
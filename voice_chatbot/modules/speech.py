@@ -1,19 +1,25 @@
-import whisper
-import pyaudio
+import io
 import wave
 import numpy as np
 import os
 import time
 import logging
 from datetime import datetime
-from gtts import gTTS
-import requests
 import re
 import threading
 from pathlib import Path
 import sys
 import ctypes
+import weakref
 from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from modules.model_registry import whisper_registry
+from modules.streaming_transcriber import StreamingTranscriber
+from modules.vad import AdaptiveVAD
+from modules.audio_capture import AudioCaptureEngine
+from modules.mp3 import concat_mp3
+from modules.tts_cache import get_tts_cache
+from modules import tracing
 
 # Configure logging
 logging.basicConfig(
@@ -31,8 +37,13 @@ if sys.platform == "win32":
     # Bypass Unix-specific checks for Whisper on Windows
     ctypes.CDLL._name = "_not_a_real_path_.dll"
 
+# Bounded pool shared by all sessions for synthesising long answers chunk by chunk
+TTS_MAX_WORKERS = 4
+_tts_pool = ThreadPoolExecutor(max_workers=TTS_MAX_WORKERS, thread_name_prefix="tts")
+
 class SpeechProcessor:
-    def __init__(self, model_size="base", audio_dir="audio_history", language="en"):
+    def __init__(self, model_size="base", audio_dir="audio_history", language="en",
+                 device=None, fp16=False, vad=None, tts_cache=True):
         """
         Initialize the speech processor with configurable parameters.
         
@@ -40,103 +51,211 @@ class SpeechProcessor:
             model_size: Whisper model size ('tiny', 'base', 'small', 'medium', 'large')
             audio_dir: Directory to store audio files
             language: Default language for TTS
+            device: Torch device for Whisper (None lets Whisper choose)
+            fp16: Run Whisper inference in half precision
+            vad: VoiceActivityDetector deciding which chunks contain speech
+                (defaults to an AdaptiveVAD)
+            tts_cache: Reuse synthesised speech from ``audio_dir/tts_cache``
         """
         self.audio_dir = Path(audio_dir)
         self.audio_dir.mkdir(parents=True, exist_ok=True)
         
-        logger.info(f"Loading Whisper model: {model_size}")
-        self.model = whisper.load_model(model_size)
+        # The model is shared with every other session in this process and is
+        # only acquired on first use or by warm_up()
+        self.model_size = model_size
+        self.device = device
+        self.fp16 = fp16
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._release_model = None
+        self.ready = threading.Event()
         self.language = language
+        self.tts_cache = get_tts_cache(self.audio_dir / "tts_cache") if tts_cache else None
         
         # Audio recording parameters
-        self.FORMAT = pyaudio.paInt16
+        self.SAMPLE_WIDTH = 2  # 16-bit samples
         self.CHANNELS = 1
         self.RATE = 16000
         self.CHUNK = 1024
         self.SILENCE_TIMEOUT = 2.5
         self.SILENCE_THRESHOLD = 10
+        self.vad = vad or AdaptiveVAD(
+            rate=self.RATE, chunk=self.CHUNK, min_threshold=self.SILENCE_THRESHOLD
+        )
+        # Microphone stream kept open across turns
+        self.capture = AudioCaptureEngine(
+            rate=self.RATE, channels=self.CHANNELS, chunk=self.CHUNK, sample_width=self.SAMPLE_WIDTH
+        )
+        # An abandoned session must not keep the input device open
+        weakref.finalize(self, self.capture.close)
+
+    @property
+    def model(self):
+        """Shared Whisper model, acquired from the registry on first access"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    model = whisper_registry.acquire(self.model_size, device=self.device, fp16=self.fp16)
+                    self._release_model = weakref.finalize(self, whisper_registry.release, model)
+                    self._model = model
+        return self._model
+
+    @property
+    def is_ready(self):
+        """True once the Whisper model is loaded and warmed up"""
+        return self.ready.is_set()
+
+    def warm_up(self, background=True):
+        """
+        Load the Whisper model and run one dummy inference.
+        
+        Args:
+            background: Run in a daemon thread so the caller is not blocked
+            
+        Returns:
+            The warm-up thread when running in the background, otherwise None
+        """
+        if not background:
+            self._warm_up()
+            return None
+        thread = threading.Thread(target=self._warm_up, name="whisper-warmup", daemon=True)
+        thread.start()
+        return thread
 
-    def speech_to_text(self, timeout=30, device_index=None):
+    def _warm_up(self):
+        try:
+            self.model.warm_up(self.language)
+            logger.info("Speech model ready")
+        except Exception as e:
+            logger.error(f"Speech model warm-up failed: {e}")
+        finally:
+            # Voice input retries the load on first use if warm-up failed
+            self.ready.set()
+
+    def speech_to_text(self, timeout=30, device_index=None, stream=False, on_partial=None):
         """
         Record audio and transcribe using Whisper.
         
         Args:
             timeout: Maximum recording time in seconds
             device_index: Specific audio input device to use
+            stream: Transcribe incrementally while recording, so the transcript
+                is ready almost as soon as speech ends
+            on_partial: Called with the partial transcript during streaming
             
         Returns:
             Transcribed text or None if error
         """
-        audio = pyaudio.PyAudio()
-        
-        # List available input devices if debugging
-        if logger.level <= logging.DEBUG:
-            self._list_audio_devices(audio)
-            
-        try:
-            stream = audio.open(
-                format=self.FORMAT,
-                channels=self.CHANNELS,
-                rate=self.RATE,
-                input=True,
-                input_device_index=device_index,
-                frames_per_buffer=self.CHUNK
+        with tracing.span("speech.speech_to_text", stream=stream) as span:
+            result = self._record_and_transcribe(timeout, device_index, stream, on_partial)
+            span.set("speech", result is not None)
+            return result
+
+    def _record_and_transcribe(self, timeout, device_index, stream, on_partial):
+        """Body of speech_to_text, traced as one span"""
+        transcriber = None
+        if stream:
+            transcriber = StreamingTranscriber(
+                self.model, language=self.language, rate=self.RATE, on_partial=on_partial
             )
-            
+            transcriber.start()
+
+        capture = self.capture
+        capture.ensure_capacity(timeout + self.vad.pre_roll_seconds)
+
+        try:
+            capture.open(device_index)
+
+            # List available input devices if debugging
+            if logger.level <= logging.DEBUG:
+                self._list_audio_devices(capture.pyaudio_instance)
+
+            capture.start()
             logger.info("Listening...")
-            frames = []
             silent_chunks = 0
             max_chunks = int(timeout * (self.RATE / self.CHUNK))
-            recording_started = False
-            
+            # The detector keeps reporting speech for its hangover after the
+            # voice stops, so that time already counts towards the timeout
+            silence_limit = max(1, self.SILENCE_TIMEOUT * (self.RATE / self.CHUNK) - self.vad.hangover_chunks)
+            self.vad.reset()
+            # Utterance bounds as absolute positions in the capture ring buffer;
+            # the start reaches back a little so the first syllable is not cut off
+            speech_start = None
+            speech_end = 0
+            pre_roll = int(self.vad.pre_roll_seconds * self.RATE)
+
             for _ in range(max_chunks):
-                data = stream.read(self.CHUNK, exception_on_overflow=False)
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                audio_level = np.abs(audio_data).mean()
-                
-                # Start recording when sound is detected
-                if audio_level >= self.SILENCE_THRESHOLD:
-                    if not recording_started:
-                        logger.debug(f"Recording started (level: {audio_level})")
-                        recording_started = True
-                    frames.append(data)
+                chunk_start = capture.position
+                samples = capture.read_chunk()
+                is_speech = self.vad.is_speech(samples)
+
+                # Start recording when speech is detected
+                if is_speech:
+                    if speech_start is None:
+                        logger.debug("Recording started")
+                        speech_start = max(0, chunk_start - pre_roll)
+                        if transcriber:
+                            transcriber.feed(capture.view(speech_start, chunk_start))
+                    speech_end = capture.position
                     silent_chunks = 0
-                elif recording_started:
-                    frames.append(data)  # Keep some silence for natural pauses
-                    silent_chunks += 1
-                    
+                    if transcriber:
+                        transcriber.feed(samples)
+                elif speech_start is not None:
+                    silent_chunks += 1  # Keep some silence for natural pauses
+                    if transcriber:
+                        transcriber.feed(samples)
+
                     # Stop if silence exceeds threshold
-                    if silent_chunks > self.SILENCE_TIMEOUT * (self.RATE / self.CHUNK):
+                    if silent_chunks > silence_limit:
                         logger.debug(f"Silence detected, stopping recording")
                         break
-                        
+
             # Don't process if nothing meaningful was recorded
-            if not recording_started or len(frames) < 3:
+            if speech_start is None or speech_end - speech_start < 3 * self.CHUNK:
                 logger.info("No speech detected")
+                if transcriber:
+                    transcriber.cancel()
                 return None
-                
+
+            # Trim the trailing silence so Whisper only sees the utterance
+            trailing = int(self.vad.trailing_seconds * self.RATE)
+            utterance = capture.view(speech_start, speech_end + trailing)
+
         except Exception as e:
             logger.error(f"Recording error: {str(e)}")
+            if transcriber:
+                transcriber.cancel()
             return None
         finally:
-            # Cleanup recording resources
-            stream.stop_stream()
-            stream.close()
-            audio.terminate()
-            
-        # Only save and transcribe if we have recorded data
-        if frames:
-            timestamp = int(time.time())
-            filename = self.audio_dir / f"input_{timestamp}.wav"
-            self._save_wav(frames, filename)
-
-            # Return both text and audio file path
-            transcription = self._transcribe_audio(filename)
-            return {
-                "text": transcription,
-                "audio_file": str(filename)
-            }
-        return None
+            # Pause capture; the device stays open for the next turn
+            capture.stop()
+
+        # Time from the end of the recording to the transcript
+        transcription_start = time.perf_counter()
+        timestamp = int(time.time())
+        filename = self.audio_dir / f"input_{timestamp}.wav"
+
+        # Archive the recording off the critical path and transcribe the
+        # samples directly instead of having Whisper decode the WAV via ffmpeg.
+        # The WAV writer gets its own copy because the ring is reused next turn.
+        saved = self._save_wav_async(utterance.tobytes(), filename)
+        tracing.current_span().set("audio_seconds", round(len(utterance) / self.RATE, 2))
+        if transcriber:
+            # Most of the audio was decoded while recording; only the tail is left
+            with tracing.span("speech.transcribe", streamed=True) as span:
+                transcription = transcriber.finish(total_samples=len(utterance))
+                span.set("text_chars", len(transcription or ""))
+        else:
+            transcription = self._transcribe_audio(self._pcm_to_float(utterance))
+
+        transcription_time = time.perf_counter() - transcription_start
+
+        # Return both text and audio file path, once the file is on disk
+        return {
+            "text": transcription,
+            "audio_file": saved.result(),
+            "transcription_time": transcription_time
+        }
             
     def _list_audio_devices(self, audio):
         """List available audio input devices for debugging"""
@@ -148,32 +267,65 @@ class SpeechProcessor:
             if device_info.get('maxInputChannels') > 0:
                 logger.debug(f"Input Device {i}: {device_info.get('name')}")
 
-    def _save_wav(self, frames, filename):
-        """Save recorded audio to WAV file"""
+    def _pcm_to_float(self, samples):
+        """Convert int16 samples to the float32 [-1, 1] array Whisper expects"""
+        return samples.astype(np.float32) / 32768.0
+
+    def _save_wav_async(self, pcm, filename):
+        """Write the WAV archive in a background thread
+
+        Returns:
+            Future resolving to the file path once written, or None if saving failed
+        """
+        future = Future()
+
+        def write():
+            future.set_result(str(filename) if self._save_wav(pcm, filename) else None)
+
+        threading.Thread(target=write, name="wav-writer").start()
+        return future
+
+    def _save_wav(self, pcm, filename):
+        """Save recorded 16-bit PCM audio to WAV file"""
         try:
             with wave.open(str(filename), 'wb') as wf:
                 wf.setnchannels(self.CHANNELS)
-                wf.setsampwidth(pyaudio.PyAudio().get_sample_size(self.FORMAT))
+                wf.setsampwidth(self.SAMPLE_WIDTH)
                 wf.setframerate(self.RATE)
-                wf.writeframes(b''.join(frames))
+                wf.writeframes(pcm)
             logger.debug(f"Audio saved to {filename}")
+            return True
         except Exception as e:
             logger.error(f"Error saving audio: {e}")
+            return False
 
-    def _transcribe_audio(self, filename):
-        """Transcribe audio file using Whisper with error handling"""
-        try:
-            logger.info(f"Transcribing {filename}")
-            # Add options for better transcription
-            result = self.model.transcribe(
-                str(filename),
-                fp16=False,  # Better compatibility
-                language=self.language
-            )
-            return result["text"].strip()
-        except Exception as e:
-            logger.error(f"Transcription error: {str(e)}")
-            return None
+    def _transcribe_audio(self, audio):
+        """
+        Transcribe audio using Whisper with error handling.
+        
+        Args:
+            audio: Path to an audio file, or a float32 mono 16 kHz NumPy array
+        """
+        with tracing.span("speech.transcribe", streamed=False) as span:
+            try:
+                if isinstance(audio, np.ndarray):
+                    logger.info(f"Transcribing {len(audio) / self.RATE:.1f}s of audio")
+                    span.set("audio_seconds", round(len(audio) / self.RATE, 2))
+                else:
+                    logger.info(f"Transcribing {audio}")
+                    audio = str(audio)
+                # Precision comes from the shared model (fp32 by default for compatibility)
+                result = self.model.transcribe(
+                    audio,
+                    language=self.language
+                )
+                text = result["text"].strip()
+                span.set("text_chars", len(text))
+                return text
+            except Exception as e:
+                logger.error(f"Transcription error: {str(e)}")
+                span.set("error", str(e))
+                return None
 
     def text_to_speech(self, text, accent='com', speed=1.0):
         """
@@ -187,70 +339,138 @@ class SpeechProcessor:
         Returns:
             Path to the generated audio file or None if error
         """
-        preprocessed_text = self.preprocess_text(text)
-        if not preprocessed_text.strip():
-            preprocessed_text = "The response contains only code or formatting, which I've omitted."
+        # Imported lazily to keep startup fast for sessions that never synthesise audio
+        import requests
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = self.audio_dir / f"response_{timestamp}.mp3"
+        with tracing.span("speech.text_to_speech", text_chars=len(text)) as span:
+            preprocessed_text = self.preprocess_text(text)
+            if not preprocessed_text.strip():
+                preprocessed_text = "The response contains only code or formatting, which I've omitted."
 
-        # Split long text into manageable chunks (gTTS has limitations)
-        max_chars = 5000
-        text_chunks = self._chunk_text(preprocessed_text, max_chars)
+            # Text we already synthesised is played back without a network call
+            cache_key = None
+            if self.tts_cache:
+                cache_key = self.tts_cache.make_key(preprocessed_text, self.language, accent, speed)
+                cached_file = self.tts_cache.get(cache_key)
+                span.set("cache_hit", cached_file is not None)
+                if cached_file:
+                    logger.info(f"Text-to-speech cache hit: {cached_file}")
+                    return cached_file
+
+            # Split long text into manageable chunks (gTTS has limitations)
+            max_chars = 5000
+            text_chunks = self._chunk_text(preprocessed_text, max_chars)
+            span.set("chunks", len(text_chunks))
         
-        try:
-            if len(text_chunks) == 1:
-                # Simple case - single chunk
-                tts = gTTS(text=text_chunks[0], lang=self.language, tld=accent, slow=(speed < 1.0))
-                tts.save(str(filename))
-            else:
-                # Multiple chunks need to be combined
-                temp_files = []
-                for i, chunk in enumerate(text_chunks):
-                    temp_file = self.audio_dir / f"temp_chunk_{timestamp}_{i}.mp3"
-                    tts = gTTS(text=chunk, lang=self.language, tld=accent, slow=(speed < 1.0))
-                    tts.save(str(temp_file))
-                    temp_files.append(str(temp_file))
-                
-                # Combine audio files using ffmpeg if available, otherwise keep the first chunk
-                if self._combine_audio_files(temp_files, str(filename)):
-                    # Cleanup temp files
-                    for temp_file in temp_files:
-                        try:
-                            os.remove(temp_file)
-                        except:
-                            pass
+            try:
+                if len(text_chunks) == 1:
+                    # Simple case - single chunk
+                    audio = self._synthesise_chunk(text_chunks[0], accent, speed)
+                else:
+                    # Synthesise all chunks concurrently in memory, then join their MP3 frames
+                    synthesise_chunk = tracing.wrap(self._synthesise_chunk)
+                    futures = [
+                        _tts_pool.submit(synthesise_chunk, chunk, accent, speed)
+                        for chunk in text_chunks
+                    ]
+                    audio = concat_mp3([future.result() for future in futures])
+                span.set("audio_bytes", len(audio))
+
+                if cache_key:
+                    filename = self.tts_cache.put(cache_key, audio)
                 else:
-                    # Fallback if combining failed
-                    filename = Path(temp_files[0])
-                    logger.warning("Could not combine audio chunks, using first chunk only")
+                    # Microseconds keep per-sentence files from the streaming pipeline apart
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+                    filename = self.audio_dir / f"response_{timestamp}.mp3"
+                    with open(filename, 'wb') as f:
+                        f.write(audio)
             
-            logger.info(f"Text-to-speech saved to {filename}")
-            return str(filename)
-        except requests.ConnectionError:
-            logger.error("Network error: Could not connect to TTS service")
+                logger.info(f"Text-to-speech saved to {filename}")
+                return str(filename)
+            except requests.ConnectionError:
+                logger.error("Network error: Could not connect to TTS service")
+                span.set("error", "connection error")
+                return None
+            except Exception as e:
+                logger.error(f"TTS error: {e}")
+                span.set("error", str(e))
+                return None
+
+    def _synthesise_chunk(self, text, accent, speed):
+        """Synthesise one chunk with gTTS into MP3 bytes"""
+        from gtts import gTTS
+        with tracing.span("speech.gtts", text_chars=len(text)):
+            buffer = io.BytesIO()
+            gTTS(text=text, lang=self.language, tld=accent, slow=(speed < 1.0)).write_to_fp(buffer)
+            return buffer.getvalue()
+
+    def combine_audio(self, audio_files):
+        """
+        Combine several response audio files into one, removing the parts
+        that are not owned by the TTS cache.
+        
+        Args:
+            audio_files: Paths of the audio files, in playback order
+            
+        Returns:
+            Path to the combined file, the only/first part if combining is
+            not possible, or None if there are no files
+        """
+        if not audio_files:
             return None
+        if len(audio_files) == 1:
+            return audio_files[0]
+
+        if self.tts_cache and all(self.tts_cache.contains_path(p) for p in audio_files):
+            # The same clips give the same answer audio; keep a single copy in the cache
+            key = self.tts_cache.make_combined_key(Path(p).stem for p in audio_files)
+            cached_file = self.tts_cache.get(key)
+            if cached_file:
+                return cached_file
+            with tracing.span("speech.combine_audio", parts=len(audio_files)):
+                audio = self._read_combined(audio_files)
+            if audio is None:
+                logger.warning("Could not combine audio parts, using first part only")
+                return audio_files[0]
+            return self.tts_cache.put(key, audio)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filename = self.audio_dir / f"response_{timestamp}.mp3"
+        with tracing.span("speech.combine_audio", parts=len(audio_files)):
+            combined = self._combine_audio_files(audio_files, str(filename))
+        if not combined:
+            logger.warning("Could not combine audio parts, using first part only")
+            return audio_files[0]
+
+        for audio_file in audio_files:
+            if self.tts_cache and self.tts_cache.contains_path(audio_file):
+                continue
+            try:
+                os.remove(audio_file)
+            except OSError:
+                pass
+        return str(filename)
+
+    def _read_combined(self, input_files):
+        """MP3 frames of several files concatenated, or None on error"""
+        try:
+            parts = []
+            for file in input_files:
+                with open(file, 'rb') as f:
+                    parts.append(f.read())
+            return concat_mp3(parts)
         except Exception as e:
-            logger.error(f"TTS error: {e}")
+            logger.error(f"Error combining audio files: {e}")
             return None
 
     def _combine_audio_files(self, input_files, output_file):
-        """Combine multiple audio files into one if ffmpeg is available"""
+        """Combine multiple MP3 files into one by concatenating their frames"""
+        audio = self._read_combined(input_files)
+        if audio is None:
+            return False
         try:
-            import subprocess
-            # Create a file list for ffmpeg
-            list_file = self.audio_dir / "filelist.txt"
-            with open(list_file, 'w') as f:
-                for file in input_files:
-                    f.write(f"file '{file}'\n")
-            
-            # Use ffmpeg to concatenate files
-            cmd = [
-                "ffmpeg", "-y", "-f", "concat", "-safe", "0", 
-                "-i", str(list_file), "-c", "copy", output_file
-            ]
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            os.remove(list_file)
+            with open(output_file, 'wb') as f:
+                f.write(audio)
             return True
         except Exception as e:
             logger.error(f"Error combining audio files: {e}")
@@ -281,9 +501,15 @@ class SpeechProcessor:
         return chunks
 
     def cleanup(self):
-        """Reset speech components and cleanup resources"""
+        """Release the input device when a chat ends; the next recording reopens it"""
         logger.info("Cleaning up resources")
-        # Nothing specific to clean up with current implementation
+        self.capture.close()
+
+    def close(self):
+        """Release the audio device and this processor's reference to the shared Whisper model"""
+        self.capture.close()
+        if self._release_model is not None:
+            self._release_model()
 
     def _cleanup_old_files(self, max_age_days=7):
         """Background task to clean up old audio files"""
@@ -0,0 +1,157 @@
+import threading
+import logging
+import numpy as np
+from typing import Callable, List, Optional
+
+logger = logging.getLogger("StreamingTranscriber")
+
+
+class StreamingTranscriber:
+    """Transcribe audio incrementally while it is still being recorded.
+
+    A worker thread repeatedly decodes the audio buffered since the last
+    commit point. A segment is committed once two consecutive decodes agree
+    on it and it is not the last (still growing) segment; its audio is then
+    dropped from the buffer. When recording ends only the uncommitted tail
+    has to be decoded, so the transcript is ready shortly after end of speech.
+    """
+
+    def __init__(self, model, language: Optional[str] = None, rate: int = 16000,
+                 min_step_seconds: float = 1.0, max_window_seconds: float = 25.0,
+                 on_partial: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            model: Whisper model (or SharedWhisperModel) exposing ``transcribe``
+            language: Language passed to Whisper
+            rate: Sample rate of the fed audio
+            min_step_seconds: New audio needed before the buffer is decoded again
+            max_window_seconds: Buffer length at which unconfirmed segments are
+                committed anyway, to stay inside Whisper's 30 s window
+            on_partial: Called with the current hypothesis after every decode
+        """
+        self.model = model
+        self.language = language
+        self.rate = rate
+        self.min_step = int(min_step_seconds * rate)
+        self.max_window = int(max_window_seconds * rate)
+        self.on_partial = on_partial
+
+        self.committed: List[str] = []
+        self._previous: List[str] = []
+        self._chunks: List[np.ndarray] = []
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._pending = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the background decoding thread"""
+        self._thread = threading.Thread(target=self._run, name="streaming-transcriber", daemon=True)
+        self._thread.start()
+
+    def feed(self, pcm) -> None:
+        """Queue a chunk of 16-bit audio, as PCM bytes or an int16 array"""
+        if isinstance(pcm, (bytes, bytearray)):
+            pcm = np.frombuffer(pcm, dtype=np.int16)
+        # astype copies, so the caller may reuse its buffer
+        samples = pcm.astype(np.float32) / 32768.0
+        with self._lock:
+            self._chunks.append(samples)
+            self._pending += len(samples)
+            if self._pending >= self.min_step:
+                self._wakeup.set()
+
+    def finish(self, total_samples: Optional[int] = None) -> Optional[str]:
+        """Stop the worker, decode the remaining audio and return the full transcript
+
+        Args:
+            total_samples: Length of the utterance within the fed audio; anything
+                fed after it (trailing silence) is not decoded
+        """
+        self._stop_worker()
+        try:
+            self._decode(final=True, total_samples=total_samples)
+        except Exception as e:
+            logger.error(f"Final streaming transcription failed: {e}")
+            return None
+        return self.text
+
+    def cancel(self) -> None:
+        """Stop the worker without decoding what is left"""
+        self._stop_worker()
+
+    @property
+    def text(self) -> str:
+        """Committed transcript plus the latest unconfirmed hypothesis"""
+        return " ".join(self.committed + self._previous).strip()
+
+    def _stop_worker(self) -> None:
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            try:
+                self._decode(final=False)
+            except Exception as e:
+                logger.error(f"Streaming transcription step failed: {e}")
+
+    def _decode(self, final: bool, total_samples: Optional[int] = None) -> None:
+        with self._lock:
+            if self._chunks:
+                self._buffer = np.concatenate([self._buffer] + self._chunks)
+                self._chunks = []
+            self._pending = 0
+            if total_samples is not None:
+                self._buffer = self._buffer[:max(0, total_samples - self._dropped)]
+            audio = self._buffer
+        if not len(audio):
+            return
+
+        # Condition on the committed text so segments join up naturally
+        result = self.model.transcribe(
+            audio,
+            language=self.language,
+            initial_prompt=" ".join(self.committed)[-200:] or None,
+            condition_on_previous_text=False
+        )
+        segments = [(seg["text"].strip(), seg["end"]) for seg in result.get("segments", [])]
+
+        if final:
+            self.committed.extend(text for text, _ in segments if text)
+            self._previous = []
+            with self._lock:
+                self._buffer = np.zeros(0, dtype=np.float32)
+            return
+
+        # Commit the prefix both decodes agree on, never the last segment
+        stable = 0
+        while (stable < len(segments) - 1 and stable < len(self._previous)
+               and segments[stable][0] == self._previous[stable]):
+            stable += 1
+        if stable == 0 and len(audio) > self.max_window and len(segments) > 1:
+            stable = len(segments) - 1
+
+        if stable:
+            self.committed.extend(text for text, _ in segments[:stable] if text)
+            cut = int(segments[stable - 1][1] * self.rate)
+            with self._lock:
+                self._buffer = self._buffer[cut:]
+                self._dropped += cut
+        self._previous = [text for text, _ in segments[stable:]]
+
+        if self.on_partial:
+            try:
+                self.on_partial(self.text)
+            except Exception as e:
+                logger.error(f"Partial transcript callback failed: {e}")
@@ -0,0 +1,229 @@
+import re
+import math
+import threading
+import logging
+from collections import OrderedDict, namedtuple
+from typing import Iterable, Optional, Tuple
+import numpy as np
+from modules.response_cache import normalize_prompt
+from modules.semantic_cache import HashingVectorizer
+
+logger = logging.getLogger("TopicClassifier")
+
+# Terms that only show up in programming questions. Generic words the old
+# keyword list also accepted ("class", "error", "windows", "program",
+# "library", ...) are left to the model, since they are just as common in
+# everyday questions.
+_PROGRAMMING_TERMS = [
+    r"code", r"coding", r"coder", r"programming", r"programmer", r"functions?",
+    r"algorithms?", r"javascript", r"typescript", r"python", r"java", r"c\+\+", r"c#",
+    r"golang", r"kotlin", r"rust", r"ruby", r"swift", r"swiftui", r"scala",
+    r"haskell", r"perl", r"lua", r"elixir", r"erlang", r"clojure", r"flutter",
+    r"fortran", r"cobol", r"matlab", r"objective-c", r"c language", r"c programming",
+    r"assembly language", r"webassembly", r"php", r"html", r"css", r"json", r"yaml", r"xml", r"apis?",
+    r"sdks?", r"frameworks?", r"compilers?", r"compile", r"interpreters?", r"syntax",
+    r"variables?", r"debug", r"debugging", r"debugger", r"databases?", r"sql", r"mysql",
+    r"postgres(?:ql)?", r"sqlite", r"mongodb", r"redis", r"http", r"https", r"graphql",
+    r"git", r"github", r"repository", r"docker", r"dockerfile", r"kubernetes", r"linux",
+    r"bash", r"shell script", r"backend", r"frontend", r"fullstack", r"full stack",
+    r"reactjs", r"angular", r"node(?:\.?js)", r"npm", r"pip", r"django", r"flask",
+    r"fastapi", r"numpy", r"pandas", r"regex", r"regular expressions?", r"recursion",
+    r"recursive", r"linked lists?", r"hash ?maps?", r"hash ?tables?", r"binary search",
+    r"big o", r"stack trace", r"null pointer", r"segfault", r"segmentation fault",
+    r"unit tests?", r"refactor", r"oop", r"polymorphism", r"async", r"multithreading",
+    r"concurrency", r"mutex", r"iterators?", r"boolean", r"gil", r"vs ?code",
+    r"stack overflow", r"software", r"devops", r"ci/cd", r"microservices?", r"websockets?",
+    r"tcp", r"udp",
+]
+_PROGRAMMING_PATTERN = re.compile(
+    r"(?<![\w+#])(?:" + "|".join(_PROGRAMMING_TERMS) + r")(?![\w+#])",
+    re.IGNORECASE
+)
+
+# Small embedded training set for the local model
+_PROGRAMMING_EXAMPLES = [
+    "how do i reverse a list", "what is the difference between a process and a thread",
+    "why is my loop running forever", "how do i read a file line by line",
+    "what does the yield keyword do", "how do i sort a dictionary by value",
+    "explain object oriented design", "what is dependency injection",
+    "how do i fix an index out of range error", "what is a memory leak",
+    "how do i center a div", "why does my page not update when state changes",
+    "how do i merge two branches", "what is a race condition",
+    "how do i parse a date from text", "how can i make my query faster",
+    "what is the difference between an abstract class and an interface",
+    "how do i install a package", "what is garbage collection",
+    "how does a hash function work", "what is tail call optimisation",
+    "what are design patterns", "how do i handle errors in my script",
+    "how do i write a for loop", "what is a callback",
+    "why do i get a type error when adding numbers and text", "how do i undo my last commit",
+    "what is the time complexity of quicksort", "how do i connect to a server from my app",
+    "how do i store user passwords securely", "what is an orm",
+    "what is the difference between let and const", "how do i split text on commas",
+    "how do i convert a number to text", "what is a virtual environment",
+    "how should i structure a large project", "what is continuous integration",
+    "how do i call a web service", "why is my build failing",
+    "what is the difference between a list and a tuple", "how do i mock an object in tests",
+    "what is a deadlock", "what is an interface", "how do i paginate results",
+    "what is caching and when should i use it", "how do i profile slow code",
+    "what is the model view controller pattern", "how do i handle a null value",
+    "what is a class", "what does this error message mean", "how do i fix this bug",
+    "how do i write a program that counts words", "what library should i use for charts",
+    "how do i send a request and read the response", "what is an object",
+    "what is the windows subsystem for linux", "how do i set up a development environment",
+    "how do i format output to two decimal places", "what is immutability",
+    "how do i return multiple values", "what is the difference between stack and heap memory",
+    "how do i make a web scraper", "what is a binary tree", "how do i sum a column",
+    "explain how sorting works", "how do i build a chat app", "what is a dictionary",
+    "how can i speed up my script", "what is version control", "what is open source",
+]
+
+_OTHER_EXAMPLES = [
+    "how do i cook pasta", "what is the weather today", "explain quantum physics",
+    "what is math", "who won the world cup", "what is the capital of france",
+    "how do i lose weight", "recommend a good movie", "what should i eat for dinner",
+    "how tall is mount everest", "tell me a joke", "what time is it in tokyo",
+    "how do i clean my windows", "what is the meaning of life", "who wrote hamlet",
+    "how do plants make food", "what is the best way to learn guitar",
+    "how do i fix a leaking tap", "what is inflation", "how far is the moon",
+    "what is a black hole", "how do i train my dog", "what are the symptoms of flu",
+    "how do i bake bread", "what is the population of india", "who painted the mona lisa",
+    "how do i write a cover letter", "what is the best exercise for back pain",
+    "how do i grow tomatoes", "what is photosynthesis", "when did world war two end",
+    "how do i change a car tyre", "what is a good name for a cat",
+    "how do i meditate", "what is the stock market", "how do vaccines work",
+    "what is the tallest building in the world", "how many calories are in an apple",
+    "what language do they speak in brazil", "how do i get better sleep",
+    "what is the difference between weather and climate", "who is the president",
+    "how do i make coffee", "what is the speed of light", "plan a trip to italy",
+    "what is a good book to read", "how do i remove a stain from a shirt",
+    "what is the best phone to buy", "how do i knit a scarf", "what causes earthquakes",
+    "what is classical music", "how do i treat a bug bite", "what is a tv program about cooking",
+    "how do i join a library", "what is the object of chess", "how do i reply to a request for a reference",
+    "what is the best response to a compliment", "what is a shipping container made of",
+    "how do i fix an error on my tax return", "what class should i take at the gym",
+    "how do i tie a tie", "what is the history of rome", "how do i paint a room",
+    "what is a healthy breakfast", "how do i improve my handwriting", "what is a haiku",
+    "how do i ask for a raise", "what is the biggest animal", "how do airplanes fly",
+    "what is yoga", "how do i say hello in spanish", "what is the boiling point of water",
+]
+
+TopicVerdict = namedtuple("TopicVerdict", ["is_programming", "confidence", "source"])
+
+
+class NaiveBayesTopicModel:
+    """Multinomial naive Bayes over hashed word and character n-grams.
+
+    Naive Bayes is badly over-confident with thousands of correlated
+    character n-grams, so the log odds are divided by the square root of the
+    number of active features before the logistic function.
+    """
+
+    def __init__(self, vectorizer: Optional[HashingVectorizer] = None, smoothing: float = 0.5):
+        self.vectorizer = vectorizer or HashingVectorizer(n_features=2048)
+        self.smoothing = smoothing
+        self._log_ratio = np.zeros(self.vectorizer.n_features, dtype=np.float64)
+        self._prior = 0.0
+
+    def fit(self, positive: Iterable[str], negative: Iterable[str]) -> "NaiveBayesTopicModel":
+        n_features = self.vectorizer.n_features
+        counts = np.full((2, n_features), self.smoothing, dtype=np.float64)
+        totals = [0, 0]
+        for label, texts in ((1, positive), (0, negative)):
+            for text in texts:
+                indices, values = self.vectorizer.features(text)
+                counts[label, indices] += values
+                totals[label] += 1
+        log_probs = np.log(counts / counts.sum(axis=1, keepdims=True))
+        self._log_ratio = log_probs[1] - log_probs[0]
+        self._prior = math.log(totals[1] / totals[0])
+        return self
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that ``text`` is a programming question"""
+        indices, values = self.vectorizer.features(text)
+        if not len(indices):
+            return 0.5
+        log_odds = float(values @ self._log_ratio[indices]) / math.sqrt(len(indices))
+        return 1.0 / (1.0 + math.exp(-max(-50.0, min(50.0, log_odds + self._prior))))
+
+
+class TopicClassifier:
+    """Offline check that a question is about programming.
+
+    Questions mentioning an unambiguous programming term are accepted by a
+    single compiled regex. The rest go to a local naive Bayes model, which
+    only accepts questions it is at least ``min_confidence`` sure about: its
+    small training set is not trusted to reject, so everything else is left
+    to the LLM, whose answer the caller reports with ``remember``. Keyword,
+    model and reported verdicts are memoised per normalised question.
+    """
+
+    def __init__(self, min_confidence: float = 0.8, max_memo_entries: int = 5000):
+        """
+        Args:
+            min_confidence: Model probability needed to accept a question
+                without the LLM check
+            max_memo_entries: Number of verdicts to remember
+        """
+        self.min_confidence = min_confidence
+        self.max_memo_entries = max_memo_entries
+        self.model = NaiveBayesTopicModel().fit(_PROGRAMMING_EXAMPLES, _OTHER_EXAMPLES)
+        self._memo: "OrderedDict[str, TopicVerdict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"keyword": 0, "model": 0, "memo": 0, "uncertain": 0}
+
+    def classify(self, text: str) -> Tuple[Optional[TopicVerdict], float]:
+        """Classify a question locally
+
+        Returns:
+            (verdict, probability): verdict is None when the local stages are
+            not confident enough; probability is the model's estimate that the
+            question is about programming
+        """
+        key = normalize_prompt(text)
+        with self._lock:
+            verdict = self._memo.get(key)
+            if verdict is not None:
+                self._memo.move_to_end(key)
+                self.counts["memo"] += 1
+                return verdict._replace(source="memo"), float(verdict.is_programming)
+
+        match = _PROGRAMMING_PATTERN.search(key)
+        if match:
+            logger.debug(f"Keyword match found: {match.group(0)}")
+            return self._store(key, TopicVerdict(True, 1.0, "keyword")), 1.0
+
+        probability = self.model.predict_proba(key)
+        if probability >= self.min_confidence:
+            return self._store(key, TopicVerdict(True, probability, "model")), probability
+
+        with self._lock:
+            self.counts["uncertain"] += 1
+        return None, probability
+
+    def remember(self, text: str, is_programming: bool, source: str = "llm") -> None:
+        """Memoise a verdict obtained elsewhere (e.g. from the LLM)"""
+        self._store(normalize_prompt(text), TopicVerdict(is_programming, 1.0, source))
+
+    def _store(self, key: str, verdict: TopicVerdict) -> TopicVerdict:
+        with self._lock:
+            if verdict.source in self.counts:
+                self.counts[verdict.source] += 1
+            self._memo[key] = verdict
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.max_memo_entries:
+                self._memo.popitem(last=False)
+        return verdict
+
+
+_classifier: Optional[TopicClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_topic_classifier() -> TopicClassifier:
+    """Return the process-wide classifier, training it on first use"""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = TopicClassifier()
+        return _classifier
@@ -0,0 +1,407 @@
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import inspect
+import logging
+import threading
+import contextvars
+import urllib.error
+import urllib.request
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("Tracing")
+
+# Tracing is off unless a sink is configured
+TRACE_FILE = os.getenv("TRACE_FILE")
+# Standard OpenTelemetry variables: a full traces URL, or a collector base URL
+OTLP_TRACES_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "voice-chatbot")
+
+EXPORT_BATCH_SIZE = 256
+EXPORT_INTERVAL_SECONDS = 0.5
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_ids = random.Random()
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is disabled; every operation does nothing"""
+
+    __slots__ = ()
+    trace_id = None
+    span_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def update(self, **attributes) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed operation within a trace.
+
+    Entering the span makes it the parent of spans opened in the same
+    context (including threads started through ``wrap`` and
+    ``asyncio.to_thread``); leaving it hands it to the exporter. Start and
+    end are wall-clock nanoseconds, with the duration measured on the
+    monotonic clock.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "error",
+                 "start_ns", "end_ns", "_root", "_started", "_token")
+
+    def __init__(self, name: str, root: bool = False, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.error = None
+        self.trace_id = None
+        self.span_id = None
+        self.parent_id = None
+        self.start_ns = None
+        self.end_ns = None
+        self._root = root
+        self._started = None
+        self._token = None
+
+    def __enter__(self):
+        parent = None if self._root else _current_span.get()
+        if parent is None:
+            self.trace_id = f"{_ids.getrandbits(128):032x}"
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        self.span_id = f"{_ids.getrandbits(64):016x}"
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._started
+        if exc_type is GeneratorExit:
+            # The consumer of a streaming generator stopped early
+            self.attributes["abandoned"] = True
+        elif exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            pass  # A generator closed from a different context
+        tracer = _tracer
+        if tracer is not None:
+            tracer.submit(self)
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def update(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class JsonlSink:
+    """Appends one JSON object per finished span to a file"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def export(self, spans: List[Span]) -> None:
+        self._file.write("".join(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n"
+                                 for s in spans))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class OtlpHttpExporter:
+    """Sends spans to an OpenTelemetry collector as OTLP/HTTP JSON.
+
+    Uses only the standard library, so no OpenTelemetry SDK is needed. A
+    collector that is down only costs a warning per outage.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = SERVICE_NAME, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self._failing = False
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        otlp = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": k, "value": self._value(v)}
+                           for k, v in span.attributes.items() if v is not None],
+        }
+        if span.parent_id:
+            otlp["parentSpanId"] = span.parent_id
+        if span.error:
+            otlp["status"] = {"code": 2, "message": span.error}  # STATUS_CODE_ERROR
+        return otlp
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name",
+                                         "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "voice_chatbot"},
+                            "spans": [self._span(s) for s in spans]}],
+        }]}
+        request = urllib.request.Request(
+            self.endpoint, data=json.dumps(payload).encode('utf-8'),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+            self._failing = False
+        except (urllib.error.URLError, OSError) as e:
+            if not self._failing:
+                logger.warning(f"Could not export traces to {self.endpoint}: {e}")
+            self._failing = True
+
+    def close(self) -> None:
+        pass
+
+
+class Tracer:
+    """Hands finished spans to the sinks from a background thread.
+
+    Spans are batched for up to ``interval`` seconds, so the request path
+    only pays for a queue put.
+    """
+
+    _STOP = object()
+
+    def __init__(self, sinks, batch_size: int = EXPORT_BATCH_SIZE,
+                 interval: float = EXPORT_INTERVAL_SECONDS):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        self._queue.put(span)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every span submitted so far has been exported"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        for sink in self.sinks:
+            sink.close()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.interval
+            while True:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._export(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _export(self, batch: List[Span]) -> None:
+        for sink in self.sinks:
+            try:
+                sink.export(batch)
+            except Exception as e:
+                logger.error(f"Trace export to {type(sink).__name__} failed: {e}")
+
+
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, root: bool = False, **attributes):
+    """Context manager timing ``name`` as a child of the current span.
+
+    Args:
+        name: Operation name, e.g. ``gemini.generate``
+        root: Start a new trace instead of joining the current one
+        **attributes: Initial span attributes
+
+    Returns:
+        A Span, or a shared no-op object if tracing is disabled
+    """
+    if _tracer is None:
+        return _NOOP_SPAN
+    return Span(name, root, attributes)
+
+
+def current_span():
+    """The innermost open span in this context, or a no-op span"""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def current_trace_id() -> Optional[str]:
+    return current_span().trace_id
+
+
+def wrap(fn: Callable) -> Callable:
+    """Bind ``fn`` to the current span so spans it opens in another thread join this trace"""
+    parent = _current_span.get()
+    if _tracer is None or parent is None:
+        return fn
+
+    @wraps(fn)
+    def traced(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+    return traced
+
+
+def traced(name: str, root: bool = False, **attributes) -> Callable:
+    """Decorator running every call of a function, coroutine function or
+    generator function in a span; generators are timed until exhausted or closed"""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def traced_coroutine(*args, **kwargs):
+                with span(name, root, **attributes):
+                    return await fn(*args, **kwargs)
+            return traced_coroutine
+
+        if inspect.isgeneratorfunction(fn):
+            @wraps(fn)
+            def traced_generator(*args, **kwargs):
+                with span(name, root, **attributes):
+                    return (yield from fn(*args, **kwargs))
+            return traced_generator
+
+        @wraps(fn)
+        def traced_function(*args, **kwargs):
+            with span(name, root, **attributes):
+                return fn(*args, **kwargs)
+        return traced_function
+    return decorate
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def configure(jsonl_path=None, otlp_endpoint: Optional[str] = None,
+              service_name: str = SERVICE_NAME) -> bool:
+    """Replace the process-wide tracer; with no sink tracing is disabled
+
+    Args:
+        jsonl_path: File receiving one JSON line per span
+        otlp_endpoint: OTLP/HTTP traces URL, e.g. http://localhost:4318/v1/traces
+
+    Returns:
+        True if tracing is enabled
+    """
+    global _tracer
+    sinks = []
+    try:
+        if jsonl_path:
+            sinks.append(JsonlSink(jsonl_path))
+    except OSError as e:
+        logger.error(f"Could not open trace file {jsonl_path}: {e}")
+    if otlp_endpoint:
+        sinks.append(OtlpHttpExporter(otlp_endpoint, service_name))
+
+    previous, _tracer = _tracer, (Tracer(sinks) if sinks else None)
+    if previous is not None:
+        previous.shutdown()
+    if _tracer is not None:
+        logger.info(f"Tracing enabled ({', '.join(type(s).__name__ for s in sinks)})")
+    return _tracer is not None
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Export every finished span now; True if there was nothing left or it completed in time"""
+    return _tracer.flush(timeout) if _tracer is not None else True
+
+
+def _shutdown() -> None:
+    if _tracer is not None:
+        _tracer.shutdown()
+
+
+def _endpoint_from_env() -> Optional[str]:
+    if OTLP_TRACES_ENDPOINT:
+        return OTLP_TRACES_ENDPOINT
+    if OTLP_ENDPOINT:
+        return OTLP_ENDPOINT.rstrip("/") + "/v1/traces"
+    return None
+
+
+configure(TRACE_FILE, _endpoint_from_env())
+atexit.register(_shutdown)
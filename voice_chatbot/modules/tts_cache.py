@@ -0,0 +1,165 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger("TTSCache")
+
+# Default budget for synthesised speech kept on disk
+TTS_CACHE_MAX_ENTRIES = 1000
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+class TTSCache:
+    """Content-addressed on-disk cache of synthesised speech.
+
+    Files are named after a hash of everything that affects the audio
+    (preprocessed text, language, accent and speed), so identical answers
+    map to one file. Entries are evicted least recently used first once
+    either the entry or the byte budget is exceeded. The LRU order survives
+    restarts through file modification times, which are bumped on every hit.
+    """
+
+    def __init__(self, cache_dir, max_entries: int = TTS_CACHE_MAX_ENTRIES,
+                 max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Index existing files, least recently used first"""
+        files = []
+        for path in self.cache_dir.glob("*.mp3"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def make_key(text: str, language: str, accent: str, speed: float) -> str:
+        """Hash of every parameter that changes the synthesised audio"""
+        payload = json.dumps([text, language, accent, speed], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_combined_key(part_keys) -> str:
+        """Hash of the cached clips joined, in order, into one file"""
+        payload = json.dumps(["combined", list(part_keys)])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp3"
+
+    def contains_path(self, path) -> bool:
+        """True if ``path`` is a file managed by this cache"""
+        return Path(path).resolve().parent == self.cache_dir.resolve()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file for ``key`` or None on a miss"""
+        path = self.path_for(key)
+        with self._lock:
+            if key in self._entries:
+                if path.exists():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    return str(path)
+                # Removed behind our back (e.g. with its conversation)
+                self._total_bytes -= self._entries.pop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, audio: bytes) -> str:
+        """Store synthesised audio and return its path"""
+        path = self.path_for(key)
+        # Sessions synthesising the same answer write the same key at once,
+        # so each write gets its own temporary file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(audio)
+            self._total_bytes += len(audio)
+            self._evict(keep=key)
+        return str(path)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._total_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            self._total_bytes -= self._entries.pop(key)
+            self.evictions += 1
+            try:
+                self.path_for(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Delete every cached file"""
+        with self._lock:
+            for path in list(self.cache_dir.glob("*.mp3")) + list(self.cache_dir.glob("*.tmp")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+
+# One cache per directory, shared by every session in the process
+_caches: Dict[str, TTSCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tts_cache(cache_dir, **kwargs) -> TTSCache:
+    """Return the process-wide cache for ``cache_dir``, creating it on first use"""
+    key = os.path.abspath(cache_dir)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = TTSCache(cache_dir, **kwargs)
+        return _caches[key]
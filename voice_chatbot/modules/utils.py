@@ -1,33 +1,127 @@
+import re
+import math
 import time
+import threading
 from functools import wraps
 from contextlib import contextmanager
 
+class LatencyHistogram:
+    """Constant-memory latency histogram with logarithmic buckets.
+
+    Bucket bounds grow by ``growth`` from ``min_value`` to ``max_value``, so
+    any percentile is known to within that relative error (about 5% with
+    the defaults) no matter how many samples are recorded. Values outside
+    the range land in the first or last bucket; the exact minimum, maximum
+    and sum are tracked separately.
+    """
+
+    def __init__(self, min_value=1e-4, max_value=600.0, growth=1.1):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets = [0] * (int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._lock = threading.Lock()
+
+    def _bucket(self, value):
+        if value <= self.min_value:
+            return 0
+        index = int(math.log(value / self.min_value) / self._log_growth) + 1
+        return min(index, len(self.buckets) - 1)
+
+    def record(self, value):
+        with self._lock:
+            self.buckets[self._bucket(value)] += 1
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Add the samples of a histogram with the same bucket layout"""
+        with self._lock:
+            for i, n in enumerate(other.buckets):
+                self.buckets[i] += n
+            self.count += other.count
+            self.total += other.total
+            if other.count:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+                self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, q):
+        """Approximate q-th percentile (q in 0-100), or None if empty"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, math.ceil(q / 100 * self.count))
+            seen = 0
+            for index, n in enumerate(self.buckets):
+                seen += n
+                if seen >= rank:
+                    break
+        if index == 0:
+            return self.min
+        # Geometric midpoint of the bucket, clamped to the observed range
+        value = self.min_value * self.growth ** (index - 0.5)
+        return min(max(value, self.min), self.max)
+
+    def summary(self):
+        """Count, mean, p50/p90/p99 and max"""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
 class TimingStats:
+    """Per-stage latency histograms plus the latest value of each stage"""
+
+    STAGES = ("transcription", "validation", "generation", "response", "tts",
+              "first_audio", "history", "total")
+    # Attributes kept for the latest value of the stages shown per request
+    _LAST_ATTRIBUTES = {"response": "last_response_time", "tts": "last_audio_time",
+                        "total": "last_total_time", "first_audio": "last_first_audio_time"}
+
     def __init__(self):
         self.startup_time = None
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        self.last = dict.fromkeys(self.STAGES)
         self.last_response_time = None
-        self.response_times = []
-        # Add new timing attributes
         self.last_audio_time = None
-        self.audio_times = []
         self.last_total_time = None
-        self.total_times = []
-    
+        # Time until the first synthesised sentence is available (streaming only)
+        self.last_first_audio_time = None
+
+    def record(self, stage, seconds):
+        """Add a measurement for ``stage`` (one of STAGES)"""
+        self.histograms[stage].record(seconds)
+        self.last[stage] = seconds
+        if stage in self._LAST_ATTRIBUTES:
+            setattr(self, self._LAST_ATTRIBUTES[stage], seconds)
+
+    def percentiles(self, stage):
+        """p50/p90/p99/max and count of a stage"""
+        return self.histograms[stage].summary()
+
     def get_average_response_time(self):
-        if not self.response_times:
-            return 0
-        return sum(self.response_times) / len(self.response_times)
-    
-    # Add new methods
+        return self.histograms["response"].mean
+
     def get_average_audio_time(self):
-        if not self.audio_times:
-            return 0
-        return sum(self.audio_times) / len(self.audio_times)
-    
+        return self.histograms["tts"].mean
+
     def get_average_total_time(self):
-        if not self.total_times:
-            return 0
-        return sum(self.total_times) / len(self.total_times)
+        return self.histograms["total"].mean
     
     def format_time(self, seconds):
         """Format seconds into minutes and seconds"""
@@ -37,8 +131,56 @@ class TimingStats:
             return f"{minutes}m {seconds:.2f}s"
         return f"{seconds:.2f}s"
 
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0-100) of a list of numbers, or None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
 @contextmanager
 def measure_time():
-    """Context manager to measure execution time"""
-    start_time = time.time()
-    yield lambda: time.time() - start_time
\ No newline at end of file
+    """Context manager to measure execution time on the monotonic high-resolution clock"""
+    start_time = time.perf_counter()
+    yield lambda: time.perf_counter() - start_time
+
+
+class SentenceSplitter:
+    """Split streamed text into sentences as it arrives.
+
+    Text inside an unterminated ``` code fence is never split, so a code
+    block always reaches the TTS preprocessor in one piece. Very short
+    pieces are merged with the next sentence to avoid tiny TTS requests.
+    """
+
+    BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+    ABBREVIATIONS = ("e.g.", "i.e.", "etc.", "vs.", "Fig.", "fig.")
+
+    def __init__(self, min_chars=40):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        """Add streamed text and return the sentences it completed"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:match.start()]
+            if len(candidate.strip()) < self.min_chars:
+                continue
+            if candidate.rstrip().endswith(self.ABBREVIATIONS):
+                continue
+            if self.buffer[:match.start()].count("```") % 2:
+                continue  # Inside a code block
+            sentences.append(candidate.strip())
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest or None
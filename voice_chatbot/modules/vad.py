@@ -0,0 +1,109 @@
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """Interface for the voice activity detectors used by SpeechProcessor.
+
+    ``is_speech`` is called once per captured chunk, in order. The
+    ``pre_roll_seconds`` and ``trailing_seconds`` attributes tell the recorder
+    how much audio to keep before speech onset and after the last speech chunk;
+    ``hangover_chunks`` is how many chunks it keeps reporting speech after
+    the voice stops.
+    """
+
+    pre_roll_seconds = 0.0
+    trailing_seconds = 0.0
+    hangover_chunks = 0
+
+    def reset(self):
+        """Forget per-utterance state before a new recording"""
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        """Classify one chunk of int16 samples"""
+        raise NotImplementedError
+
+
+class ThresholdVAD(VoiceActivityDetector):
+    """Fixed mean-amplitude threshold (the original detector)"""
+
+    def __init__(self, threshold: float = 10):
+        self.threshold = threshold
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        return np.abs(samples).mean() >= self.threshold
+
+
+class AdaptiveVAD(VoiceActivityDetector):
+    """Energy detector whose threshold follows the room's noise floor.
+
+    The noise floor is an asymmetric moving average of the RMS level: it drops
+    quickly when the room gets quieter and rises slowly on non-speech chunks,
+    so steady noise such as a fan ends up below the threshold. Speech must last
+    ``onset_chunks`` chunks to trigger, and the detector keeps reporting speech
+    for ``hangover_seconds`` after the level drops, which bridges short pauses
+    between words.
+    """
+
+    def __init__(self, rate: int = 16000, chunk: int = 1024, min_threshold: float = 10,
+                 speech_ratio: float = 3.0, onset_chunks: int = 2, hangover_seconds: float = 0.3,
+                 pre_roll_seconds: float = 0.3, trailing_seconds: float = 0.2,
+                 floor_rise: float = 0.02, floor_fall: float = 0.3):
+        """
+        Args:
+            rate: Sample rate in Hz
+            chunk: Samples per chunk passed to ``is_speech``
+            min_threshold: Lowest RMS level ever treated as speech
+            speech_ratio: How far above the noise floor speech has to be
+            onset_chunks: Consecutive loud chunks needed to start speech
+            hangover_seconds: Time speech is still reported after the level drops
+            pre_roll_seconds: Audio to keep from before the detected onset
+            trailing_seconds: Audio to keep after the last speech chunk
+            floor_rise: Smoothing factor when the level is above the floor
+            floor_fall: Smoothing factor when the level is below the floor
+        """
+        self.min_threshold = min_threshold
+        self.speech_ratio = speech_ratio
+        self.onset_chunks = onset_chunks
+        self.hangover_chunks = max(0, int(round(hangover_seconds * rate / chunk)))
+        self.pre_roll_seconds = pre_roll_seconds
+        self.trailing_seconds = trailing_seconds
+        self.floor_rise = floor_rise
+        self.floor_fall = floor_fall
+
+        # The noise floor persists across recordings; it describes the room
+        self.noise_floor = None
+        self.reset()
+
+    def reset(self):
+        self._loud_run = 0
+        self._hangover = 0
+        self._active = False
+
+    @property
+    def threshold(self) -> float:
+        """Current speech threshold"""
+        if self.noise_floor is None:
+            return self.min_threshold
+        return max(self.min_threshold, self.noise_floor * self.speech_ratio)
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        level = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+        loud = level >= self.threshold
+
+        if self.noise_floor is None:
+            self.noise_floor = level
+        elif level < self.noise_floor:
+            self.noise_floor += self.floor_fall * (level - self.noise_floor)
+        elif not loud:
+            self.noise_floor += self.floor_rise * (level - self.noise_floor)
+
+        self._loud_run = self._loud_run + 1 if loud else 0
+        if self._loud_run >= self.onset_chunks or (self._active and loud):
+            self._active = True
+            self._hangover = self.hangover_chunks
+        elif self._active:
+            if self._hangover > 0:
+                self._hangover -= 1
+            else:
+                self._active = False
+        return self._active
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules are imported as ``modules.<name>``, relative to the voice_chatbot directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
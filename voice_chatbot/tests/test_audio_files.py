@@ -0,0 +1,37 @@
+from pathlib import Path
+from benchmarks.fakes import install_fakes
+
+
+def test_combined_audio_is_cached(tmp_path):
+    with install_fakes(tts_latency=0.0):
+        from modules.speech import SpeechProcessor
+        processor = SpeechProcessor(audio_dir=tmp_path / "audio")
+        parts = [processor.text_to_speech(s) for s in ("First sentence.", "Second sentence.")]
+
+        first = processor.combine_audio(parts)
+        second = processor.combine_audio(parts)
+
+    assert first == second
+    assert processor.tts_cache.contains_path(first)
+    assert all(Path(p).exists() for p in parts)
+    assert not list((tmp_path / "audio").glob("response_*.mp3"))
+
+
+def test_deleting_a_conversation_keeps_shared_cached_audio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with install_fakes(tts_latency=0.0):
+        from modules.speech import SpeechProcessor
+        from modules.history_manager import HistoryManager
+        processor = SpeechProcessor()
+        history = HistoryManager()
+        audio = processor.text_to_speech("Use slicing with a step of minus one.")
+        history.save_conversation([("user", "How do I reverse a list?", None), ("bot", "Slicing.", audio)])
+        history.save_conversation([("user", "Reverse a list?", None), ("bot", "Slicing.", audio)])
+
+        first = history.get_conversations(0, 2)[-1]
+        assert history.delete_conversation(first["timestamp"])
+        assert Path(audio).exists()
+
+        assert history.delete_all_history()
+        assert not Path(audio).exists()
+        assert not list(Path("audio_history/tts_cache").iterdir())
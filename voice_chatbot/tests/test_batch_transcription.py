@@ -0,0 +1,35 @@
+import json
+import wave
+from modules import batch_transcription
+from modules.batch_transcription import load_manifest, transcribe_directory
+
+
+def _failing_init(*args):
+    raise RuntimeError("model failed to load")
+
+
+def _write_wav(path):
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(b"\0\0" * 1600)
+
+
+def test_failed_worker_start_marks_every_file_failed(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_transcription, "_init_worker", _failing_init)
+    recordings = tmp_path / "recordings"
+    recordings.mkdir()
+    for i in range(6):
+        _write_wav(recordings / f"clip_{i}.wav")
+    manifest = tmp_path / "manifest.jsonl"
+
+    report = transcribe_directory(recordings, manifest, workers=1)
+
+    assert report.error and "Worker processes stopped" in report.error
+    assert report.transcribed == 0 and report.failed == 6
+    records = [json.loads(line) for line in manifest.read_text().splitlines()]
+    assert sorted(r["file"] for r in records) == sorted(str(p) for p in recordings.glob("*.wav"))
+    assert all("error" in r for r in records)
+    # Failed files are retried by the next run
+    assert load_manifest(manifest) == set()
@@ -0,0 +1,49 @@
+import threading
+from benchmarks.fakes import install_fakes
+
+
+def _stream_bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from modules import gemini
+    from modules.chatbot import Chatbot
+    monkeypatch.setattr(gemini, "API_KEY", "test")
+    bot = Chatbot(fast_start=False)
+    bot.gemini.semantic_cache = None
+    return bot
+
+
+def test_failed_sentence_does_not_end_the_audio_stream(tmp_path, monkeypatch):
+    with install_fakes(gemini_latency=0.0, gemini_jitter=0.0, tts_latency=0.0):
+        bot = _stream_bot(tmp_path, monkeypatch)
+        synthesise = bot.speech_processor.text_to_speech
+        calls = []
+
+        def flaky(text):
+            calls.append(text)
+            return None if len(calls) == 2 else synthesise(text)
+
+        monkeypatch.setattr(bot.speech_processor, "text_to_speech", flaky)
+        events = list(bot.process_text_input_stream("How do I reverse a list in Python?"))
+
+    audio = [payload for kind, payload in events if kind == "audio"]
+    assert len(calls) > 2
+    assert len(audio) == len(calls) - 1 and None not in audio
+    assert events[-1][0] == "done" and events[-1][1][2]
+
+
+def test_abandoned_stream_stops_the_tts_worker(tmp_path, monkeypatch):
+    with install_fakes(gemini_latency=0.0, gemini_jitter=0.0, tts_latency=0.0):
+        bot = _stream_bot(tmp_path, monkeypatch)
+        stream = bot.process_text_input_stream("How do I reverse a list in Python?")
+        assert next(stream)[0] == "text"
+        stream.close()
+
+    assert not [t for t in threading.enumerate() if t.name == "tts-pipeline"]
+
+
+def test_only_the_canned_replies_are_muted():
+    from modules.chatbot import Chatbot
+    from modules.gemini import RATE_LIMIT_MESSAGE, REJECTION_MESSAGE
+    assert not Chatbot._should_speak(RATE_LIMIT_MESSAGE)
+    assert not Chatbot._should_speak(REJECTION_MESSAGE)
+    assert Chatbot._should_speak("Rate limiting is a technique for capping request rates.")
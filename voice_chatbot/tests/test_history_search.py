@@ -0,0 +1,35 @@
+import pytest
+from modules.history_store import JsonlHistoryStore, SqliteHistoryStore
+
+
+def _conversation(timestamp, *contents):
+    return {"timestamp": timestamp,
+            "messages": [{"role": "user", "content": c, "audio_file": None} for c in contents]}
+
+
+@pytest.fixture(params=["jsonl", "sqlite", "sqlite-like"])
+def store(request, tmp_path):
+    if request.param == "jsonl":
+        store = JsonlHistoryStore(tmp_path / "history.jsonl")
+    else:
+        store = SqliteHistoryStore(tmp_path / "history.db")
+        store.has_fts = request.param == "sqlite"
+    store.add(_conversation("2024-01-01T00:00:00", "How do I use Python generators?"))
+    store.add(_conversation("2024-01-02T00:00:00", "Coverage is 100% on my_module"))
+    yield store
+    if hasattr(store, "close"):
+        store.close()
+
+
+def test_partial_words_match_on_every_backend(store):
+    results = store.search("pyth", 10)
+    assert [r["content"] for r in results] == ["How do I use Python generators?"]
+
+
+def test_like_wildcards_match_literally(store):
+    if getattr(store, "has_fts", False):
+        pytest.skip("FTS5 tokenises away punctuation")
+    assert len(store.search("100%", 10)) == 1
+    assert store.search("0%o", 10) == []
+    assert len(store.search("my_module", 10)) == 1
+    assert store.search("m_module", 10) == []
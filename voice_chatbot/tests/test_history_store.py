@@ -0,0 +1,34 @@
+import multiprocessing
+import pytest
+from modules.history_store import JsonlHistoryStore, fcntl
+
+
+def _conversation(timestamp):
+    return {"timestamp": timestamp, "messages": [{"role": "user", "content": timestamp, "audio_file": None}]}
+
+
+def _append_many(log_file, prefix, count):
+    store = JsonlHistoryStore(log_file, background_compaction=False)
+    for i in range(count):
+        store.add(_conversation(f"{prefix}-{i:04d}"))
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl")
+def test_compaction_in_one_process_keeps_appends_from_another(tmp_path):
+    log_file = tmp_path / "history.jsonl"
+    store = JsonlHistoryStore(log_file, background_compaction=False)
+    for i in range(20):
+        store.add(_conversation(f"main-{i:04d}"))
+        store.delete(f"main-{i:04d}")
+
+    context = multiprocessing.get_context("fork")
+    writer = context.Process(target=_append_many, args=(log_file, "worker", 300))
+    writer.start()
+    while writer.is_alive():
+        store.compact()
+    writer.join()
+    assert writer.exitcode == 0
+
+    store.compact()
+    assert JsonlHistoryStore(log_file, background_compaction=False).count() == 300
+    assert store.count() == 300
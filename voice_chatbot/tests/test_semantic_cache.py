@@ -0,0 +1,80 @@
+import time
+from modules.gemini import GeminiModel
+from modules.semantic_cache import SemanticCache
+from modules.rate_limiter import TokenBucketLimiter
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return _Response(f"Answer {self.calls}")
+
+
+def _model():
+    gemini = GeminiModel(api_key="test", cache_path=None, semantic_threshold=0.85, speculative=False)
+    gemini._model = gemini._validation_model = _CountingModel()
+    # Not the process-wide limiter, which other tests may have drained
+    gemini.rate_limiter = TokenBucketLimiter(rate=1e6, burst=10 ** 6)
+    return gemini
+
+
+def test_paraphrase_is_served_from_semantic_tier():
+    gemini = _model()
+    first = gemini.generate_response("How do I reverse a list in Python?")
+    assert len(gemini.semantic_cache) == 1
+
+    second = gemini.generate_response("How do you reverse a list in Python")
+    assert second == first
+    assert gemini.model.calls == 1
+    assert gemini.semantic_cache.stats()["hits"] == 1
+
+
+def test_clear_cache_clears_semantic_tier():
+    gemini = _model()
+    gemini.generate_response("How do I reverse a list in Python?")
+    gemini.clear_cache()
+    assert len(gemini.semantic_cache) == 0
+    gemini.generate_response("How do you reverse a list in Python")
+    assert gemini.model.calls == 2
+
+
+def test_expired_entries_are_not_served():
+    cache = SemanticCache(threshold=0.5)
+    cache.add("How do I reverse a list in Python?", "old", ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.lookup("How do I reverse a list in Python?") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_byte_budget_evicts_oldest():
+    column = 512 * 4
+    cache = SemanticCache(threshold=0.5, max_bytes=3 * (column + 200))
+    for i in range(5):
+        cache.add(f"question number {i} about python", "x" * 150)
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= 3 * (column + 200)
+    assert cache.lookup("question number 0 about python")[0] == "x" * 150  # a newer paraphrase
+    assert "question number 0 about python" not in cache._prompts
+
+
+def test_entry_limit_reuses_slots():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    for prompt in ("sort a dict by value", "merge two dicts", "reverse a string"):
+        cache.add(prompt, prompt.upper())
+    assert len(cache) == 2
+    assert cache.lookup("sort a dict by value") is None
+    assert cache.lookup("reverse a string")[0] == "REVERSE A STRING"
+
+
+def test_semantic_tier_is_off_by_default():
+    assert GeminiModel(api_key="test", cache_path=None, speculative=False).semantic_cache is None
@@ -0,0 +1,34 @@
+import asyncio
+from modules.single_flight import SingleFlight
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def main():
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "answer"
+
+        leader = asyncio.ensure_future(flight.do_async("key", work))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.do_async("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await leader, await waiters[1], waiters[0].cancelled()
+
+    assert asyncio.run(main()) == ("answer", "answer", True)
+    assert flight.stats() == {"leaders": 1, "coalesced": 2, "in_flight": 0}
+
+
+def test_finish_after_the_future_was_cancelled_is_a_no_op():
+    flight = SingleFlight()
+    future, leader = flight.join("key")
+    assert leader and future.cancel()
+    flight.finish("key", future, "answer")
+    flight.fail("key", future, RuntimeError("late"))
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,48 @@
+import time
+import threading
+from modules.gemini import GeminiModel, SPECULATIVE_MAX_WORKERS
+from modules.rate_limiter import TokenBucketLimiter
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _SlowModel:
+    """Validation takes 0.1 s, generation 0.5 s"""
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        if generation_config is not None:
+            time.sleep(0.1)
+            return _Response("TRUE")
+        time.sleep(0.5)
+        return _Response("Answer")
+
+
+def test_speculation_does_not_queue_behind_other_sessions():
+    sessions = 3 * SPECULATIVE_MAX_WORKERS
+    models = []
+    for _ in range(sessions):
+        gemini = GeminiModel(api_key="test", cache_path=None, speculative=True)
+        gemini._model = gemini._validation_model = _SlowModel()
+        gemini.rate_limiter = TokenBucketLimiter(rate=1e6, burst=10 ** 6)
+        # Every question needs the LLM check
+        gemini._validate_locally = lambda text: (None, 0.5)
+        models.append(gemini)
+
+    latencies = []
+
+    def ask(index, gemini):
+        start = time.perf_counter()
+        assert gemini.generate_response(f"Ambiguous question {index}") == "Answer"
+        latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=ask, args=(i, g)) for i, g in enumerate(models)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Sequential validation + generation takes 0.6 s; queueing took up to 1.5 s
+    assert max(latencies) < 0.9
@@ -0,0 +1,56 @@
+import gc
+import wave
+import pytest
+from benchmarks.fakes import FakePyAudio, install_fakes
+
+RATE = 16000
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_recording_stops_silence_timeout_after_the_voice(tmp_path, stream):
+    with install_fakes(whisper_rtf=0.0):
+        from modules.speech import SpeechProcessor
+        processor = SpeechProcessor(audio_dir=tmp_path / "audio", tts_cache=False)
+        processor.warm_up(background=False)
+        try:
+            assert processor.speech_to_text(stream=stream)
+        finally:
+            processor.close()
+
+    # synthetic_utterance's voice ends 2.5 s into the signal
+    waited = FakePyAudio.last_stream.cursor / RATE - 2.5
+    assert processor.SILENCE_TIMEOUT <= waited < processor.SILENCE_TIMEOUT + 2 * processor.CHUNK / RATE
+
+
+def test_recording_is_on_disk_when_returned(tmp_path):
+    with install_fakes(whisper_rtf=0.0):
+        from modules.speech import SpeechProcessor
+        processor = SpeechProcessor(audio_dir=tmp_path / "audio", tts_cache=False)
+        processor.warm_up(background=False)
+        try:
+            result = processor.speech_to_text()
+        finally:
+            processor.close()
+
+    with wave.open(result["audio_file"], 'rb') as wf:
+        assert wf.getnframes() > RATE
+
+
+def test_ending_a_session_releases_the_input_device(tmp_path):
+    with install_fakes(whisper_rtf=0.0):
+        from modules.speech import SpeechProcessor
+        processor = SpeechProcessor(audio_dir=tmp_path / "audio", tts_cache=False)
+        processor.warm_up(background=False)
+        assert processor.speech_to_text()
+        capture = processor.capture
+        assert capture.pyaudio_instance is not None
+
+        processor.cleanup()
+        assert capture.pyaudio_instance is None and capture._stream is None
+
+        # The next turn reopens the device; dropping the processor releases it again
+        assert processor.speech_to_text()
+        assert capture.pyaudio_instance is not None
+        del processor
+        gc.collect()
+        assert capture.pyaudio_instance is None and capture._stream is None
@@ -0,0 +1,34 @@
+import pytest
+from modules.topic_classifier import TopicClassifier
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return TopicClassifier()
+
+
+@pytest.mark.parametrize("question", [
+    "What is Rust ownership?", "How do closures work in Ruby?", "Is Swift faster than Kotlin?",
+])
+def test_language_names_are_accepted_by_keyword(classifier, question):
+    verdict, _ = classifier.classify(question)
+    assert verdict.is_programming and verdict.source == "keyword"
+
+
+@pytest.mark.parametrize("question", [
+    "What is a cookie in a browser?", "Who invented the C language?",
+    "How do I cook pasta?", "What is the capital of France?",
+])
+def test_questions_are_never_rejected_locally(classifier, question):
+    verdict, _ = classifier.classify(question)
+    assert verdict is None or verdict.is_programming
+    # An uncertain question is not memoised, so it reaches the LLM again
+    if verdict is None:
+        assert classifier.classify(question)[0] is None
+
+
+def test_llm_verdicts_are_memoised(classifier):
+    assert classifier.classify("How do I bake sourdough bread?")[0] is None
+    classifier.remember("How do I bake sourdough bread?", False)
+    verdict, _ = classifier.classify("how do i bake sourdough bread")
+    assert not verdict.is_programming and verdict.source == "memo"
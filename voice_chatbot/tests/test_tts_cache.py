@@ -0,0 +1,29 @@
+import threading
+from pathlib import Path
+from modules.tts_cache import TTSCache
+
+
+def test_concurrent_puts_of_one_key_all_succeed(tmp_path):
+    cache = TTSCache(tmp_path)
+    key = cache.make_key("Use slicing.", "en", "com", 1.0)
+    start = threading.Barrier(8)
+    paths, errors = [], []
+
+    def put():
+        start.wait()
+        for _ in range(50):
+            try:
+                paths.append(cache.put(key, b"audio" * 1000))
+            except OSError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert set(paths) == {str(cache.path_for(key))}
+    assert Path(paths[0]).read_bytes() == b"audio" * 1000
+    assert not list(tmp_path.glob("*.tmp"))